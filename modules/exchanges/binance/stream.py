@@ -1,11 +1,10 @@
 import asyncio
 import inspect
 import logging
+import sys
 from time import time
-from typing import List, Dict, Set, Callable
+from typing import List, Dict, Tuple, Callable
 
-import orjson
-from aiohttp import ClientSession
 from yarl import URL
 
 from modules.websocket import WebSocketClient
@@ -17,6 +16,21 @@ from modules.models.types import Symbol, StreamEntity, UserStreamEntity
 from .client import BinanceUserClient
 from ...models.exchange import AccountConfigModel
 
+# Event type, symbol and enum-valued fields (side, status, order type, ...)
+INTERNED_FIELDS = ('e', 's', 'S', 'X', 'x', 'o', 'ps')
+
+
+def intern_fields(data: Dict):
+    """
+    Interns the enum-valued strings of a payload, so that comparisons
+    and enum lookups hit the identical string object.
+    """
+    for key in INTERNED_FIELDS:
+        value = data.get(key)
+
+        if type(value) is str:
+            data[key] = sys.intern(value)
+
 
 class BinanceStreamClient(BaseExchangeStreamClient):
     """
@@ -29,11 +43,7 @@ class BinanceStreamClient(BaseExchangeStreamClient):
         super().__init__()
 
         self._ws_url = URL('wss://stream.binancefuture.com/' if testnet else 'wss://fstream.binance.com/')
-        self.ws = WebSocketClient(
-            session=ClientSession(
-                json_serialize=lambda x: orjson.dumps(x).decode()
-            )
-        )
+        self.ws = WebSocketClient()
         self.ws.add_connect_callback(self._on_connect)
         self.ws.add_message_callback(self._on_message)
 
@@ -72,6 +82,7 @@ class BinanceStreamClient(BaseExchangeStreamClient):
             logging.info(f'ID {_id} successfully subscribed!')
 
         elif 'e' in payload:
+            intern_fields(payload)
             entity = payload['e']
 
             # Stream Name: <symbol>@aggTrade
@@ -108,9 +119,6 @@ class BinanceUserStreamClient:
         self._ws_url = URL('wss://stream.binancefuture.com/' if testnet else 'wss://fstream.binance.com/')
         self._exchange = exchange
         self.ws = WebSocketClient(
-            session=ClientSession(
-                json_serialize=lambda x: orjson.dumps(x).decode()
-            ),
             receive_timeout=None,
         )
         self.ws.add_connect_callback(self._on_connect)
@@ -119,7 +127,7 @@ class BinanceUserStreamClient:
 
         self._connect_event = asyncio.Event()
         self._listen_key_exp: int = 0
-        self._callbacks: Dict[UserStreamEntity, Set] = {}
+        self._callbacks: Dict[UserStreamEntity, Tuple[Callable, ...]] = {}
 
     @property
     def is_connected(self) -> bool:
@@ -151,7 +159,11 @@ class BinanceUserStreamClient:
 
     def add_update_callback(self, event_type: UserStreamEntity, cb: Callable):
         UserStreamEntity.has_value(event_type)
-        self._callbacks.setdefault(event_type, set()).add(cb)
+        callbacks = self._callbacks.get(event_type, ())
+
+        # Stored as a tuple, it's iterated on every order update and rarely changes
+        if cb not in callbacks:
+            self._callbacks[event_type] = (*callbacks, cb)
 
     def _on_connect(self):
         self._connect_event.set()
@@ -161,6 +173,7 @@ class BinanceUserStreamClient:
 
     async def _on_message(self, payload: Dict):
         if 'e' in payload:
+            intern_fields(payload)
             raw_entity = payload['e']
 
             if raw_entity == 'ACCOUNT_UPDATE':
@@ -174,14 +187,13 @@ class BinanceUserStreamClient:
                 await self._trigger_callbacks(entity, model)
 
             elif raw_entity == 'ORDER_TRADE_UPDATE':
+                intern_fields(payload['o'])
                 entity = UserStreamEntity.ORDER_TRADE_UPDATE
                 model = OrderModel.from_user_stream(payload)
                 await self._trigger_callbacks(entity, model)
 
     async def _trigger_callbacks(self, entity: UserStreamEntity, model):
-        callbacks = self._callbacks.get(entity, set())
-
-        for callback in callbacks:
+        for callback in self._callbacks.get(entity, ()):
             result = callback(model)
 
             if inspect.isawaitable(result):
@@ -5,7 +5,7 @@ import random
 import time
 from abc import ABC
 from decimal import Decimal
-from typing import Dict, Optional, List, Set, Callable
+from typing import Dict, Optional, List, Set, Tuple, Callable
 from itertools import chain
 
 import orjson
@@ -205,8 +205,11 @@ class FakeExchangeUserClient(BaseExchangeUserClient, ABC):
 
         if is_enter:
             entry_orders = self._get_entry_orders(position.symbol, position_side)
-            total_price = sum([order.quantity * order.entry_price for order in entry_orders])
-            total_quantity = sum([order.quantity for order in entry_orders])
+            total_price = total_quantity = Decimal('0')
+
+            for entry_order in entry_orders:
+                total_price += entry_order.quantity * entry_order.entry_price
+                total_quantity += entry_order.quantity
 
             position.quantity += quantity
             position.entry_price = to_decimal_places(total_price / total_quantity, contract.lot_size)
@@ -269,18 +272,20 @@ class FakeExchangeUserClient(BaseExchangeUserClient, ABC):
 
 class FakeUserStream:
     def __init__(self):
-        self._callbacks: Dict[UserStreamEntity, Set] = {}
+        self._callbacks: Dict[UserStreamEntity, Tuple[Callable, ...]] = {}
 
     async def connect(self):
         pass
 
     def add_update_callback(self, entity: UserStreamEntity, cb: Callable):
-        self._callbacks.setdefault(entity, set()).add(cb)
+        callbacks = self._callbacks.get(entity, ())
 
-    async def trigger_callbacks(self, entity: UserStreamEntity, model):
-        callbacks = self._callbacks.get(entity, set())
+        # Stored as a tuple, it's iterated on every order update and rarely changes
+        if cb not in callbacks:
+            self._callbacks[entity] = (*callbacks, cb)
 
-        for callback in callbacks:
+    async def trigger_callbacks(self, entity: UserStreamEntity, model):
+        for callback in self._callbacks.get(entity, ()):
             result = callback(model)
 
             if inspect.isawaitable(result):
@@ -3,12 +3,12 @@ import inspect
 import logging
 from itertools import product
 from time import time
-from typing import Callable, Set, Dict, List
+from typing import Callable, Set, Dict, List, Tuple, Optional
 
 from modules.models.line import TradeUpdateModel, BookUpdateModel, DepthUpdateModel
 from modules.models.types import Symbol, StreamEntity
 
-from .types import BulkLineCallback
+from .types import BulkLineCallback, BatchLineCallback, EntityModel
 from .subscriber import LineSubscriber
 
 __all__ = (
@@ -22,6 +22,8 @@ class LineClient:
             uri: str,
             symbols: List[Symbol],
             entities: List[StreamEntity],
+            batch_size: int = 64,
+            flush_interval_ms: int = 5,
     ):
         self.subscriber = LineSubscriber(uri)
         self._symbols = symbols
@@ -31,6 +33,7 @@ class LineClient:
         self._connected = False
         self._callbacks: Dict[str, Set] = {}
         self._update_callbacks: Dict[StreamEntity, Set] = {}
+        self._batch_callbacks: Dict[StreamEntity, Set] = {}
         self._models = {
             StreamEntity.TRADE: TradeUpdateModel,
             StreamEntity.BOOK: BookUpdateModel,
@@ -38,6 +41,14 @@ class LineClient:
         }
         self._loop = asyncio.get_event_loop()
 
+        # Updates for the batch callbacks, delivered every `batch_size` updates or `flush_interval_ms`
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval_ms / 1000
+        self._batches: Dict[Tuple[StreamEntity, Symbol], List[EntityModel]] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+
         self.subscriber.add_reconnect_callback(self._on_reconnect)
         self.subscriber.add_alive_callback(self._on_alive)
         self.subscriber.add_reset_callback(self._on_reset)
@@ -53,7 +64,16 @@ class LineClient:
         if self._connected:
             await self.subscriber.disconnect()
             self._connected = False
-            self._loop.stop()
+
+            # No timer fires after the subscriber is gone, the undelivered updates are dropped
+            if self._flush_handle:
+                self._flush_handle.cancel()
+                self._flush_handle = None
+
+            self._batches.clear()
+
+            if self._flush_task and self._flush_task is not asyncio.current_task():
+                await self._flush_task
 
     def add_reset_callback(self, cb: Callable):
         self._callbacks.setdefault('reset', set()).add(cb)
@@ -64,6 +84,15 @@ class LineClient:
 
         self._update_callbacks.setdefault(entity, set()).add(cb)
 
+    def add_batch_update_callback(self, entity: StreamEntity, cb: BatchLineCallback):
+        """
+        The callback receives the updates of a symbol in batches, in the order they arrived.
+        """
+        assert StreamEntity.has_value(entity)
+        assert callable(cb)
+
+        self._batch_callbacks.setdefault(entity, set()).add(cb)
+
     @property
     def is_alive(self):
         return self._last_alive and time() - self._last_alive < 10
@@ -93,9 +122,43 @@ class LineClient:
 
         model_class = self._models[entity]
         model = model_class(**data)
-        callbacks = self._update_callbacks.get(entity, set())
+        callbacks = self._update_callbacks.get(entity)
+
+        if callbacks:
+            await self._trigger_callbacks(callbacks, symbol, model)
+
+        if entity in self._batch_callbacks:
+            await self._add_to_batch(entity, symbol, model)
+
+    async def _add_to_batch(self, entity: StreamEntity, symbol: Symbol, model: EntityModel):
+        batch = self._batches.setdefault((entity, symbol), [])
+        batch.append(model)
+
+        if len(batch) >= self._batch_size:
+            await self._flush_batch(entity, symbol)
+
+        elif self._flush_handle is None:
+            self._flush_handle = self._loop.call_later(self._flush_interval, self._schedule_flush)
+
+    def _schedule_flush(self):
+        self._flush_handle = None
+        self._flush_task = self._loop.create_task(self._flush())
+
+    async def _flush(self):
+        for entity, symbol in list(self._batches):
+            await self._flush_batch(entity, symbol)
+
+    async def _flush_batch(self, entity: StreamEntity, symbol: Symbol):
+        # Timer flushes run concurrently with the consumer, batches are still delivered one at a time
+        async with self._flush_lock:
+            models = self._batches.pop((entity, symbol), None)
 
-        await self._trigger_callbacks(callbacks, symbol, model)
+            if models:
+                # Errors are logged per batch, so that one failing callback does not hold back other symbols
+                try:
+                    await self._trigger_callbacks(self._batch_callbacks[entity], symbol, models)
+                except Exception as err:
+                    logging.exception('Exception during batch processing: %r', err)
 
     @staticmethod
     async def _trigger_callbacks(callbacks, *args, **kwargs):
@@ -46,7 +46,6 @@ class ReplayClient:
     async def disconnect(self):
         if self._connected:
             self._connected = False
-            self._loop.stop()
 
     def add_update_callback(self, entity: StreamEntity, cb: BulkLineCallback):
         assert callable(cb)
@@ -66,29 +65,35 @@ class ReplayClient:
             query.setdefault('t', {})['$lte'] = self.replay_to
 
         prev_dt = None
-        prev_log: Optional[UpdateLogModel] = None
+        prev_timestamp: Optional[Timestamp] = None
         processed_cnt = 0
 
         total_cnt = await self.db.count(UpdateLogModel, query)
         delta = int(total_cnt / 100)
 
-        async for log in self.db.find_iter(UpdateLogModel, query, sort=[('t', ASCENDING)]):
-            if prev_log and self.replay_speed:
-                diff = log.timestamp - prev_log.timestamp
+        # Raw rows, the entity model is decoded from the row data directly
+        logs = self.db.find_iter(UpdateLogModel, query, sort=[('t', ASCENDING)], batch_size=1000, raw=True)
+
+        async for log in logs:
+            timestamp = log['t']
+
+            if prev_timestamp is not None and self.replay_speed:
+                diff = timestamp - prev_timestamp
                 delay = diff / 1000 / self.replay_speed
 
                 if delay >= 0.01:
                     await asyncio.sleep(delay)
 
-            dt = self._get_datetime(log.timestamp)
+            dt = self._get_datetime(timestamp)
 
             if prev_dt and dt != prev_dt:
                 s = dt.strftime('%d.%m.%Y %H:%M')
                 logging.info(f'Current replay period: {s}')
 
-            await self._trigger_update_callbacks(log.symbol, log.entity, log.get_entity_model())
+            entity = StreamEntity(log['e'])
+            await self._trigger_update_callbacks(log['s'], entity, UpdateLogModel.decode_entity(entity, log['d']))
             prev_dt = dt
-            prev_log = log
+            prev_timestamp = timestamp
             processed_cnt += 1
 
             if processed_cnt % delta == 0:
@@ -1,4 +1,4 @@
-from typing import Union, Protocol
+from typing import Union, Protocol, List
 
 from modules.models import TradeUpdateModel, BookUpdateModel, DepthUpdateModel
 from modules.models.types import Symbol
@@ -9,3 +9,8 @@ EntityModel = Union[TradeUpdateModel, BookUpdateModel, DepthUpdateModel]
 class BulkLineCallback(Protocol):
     def __call__(self, symbol: Symbol, model: EntityModel):
         ...
+
+
+class BatchLineCallback(Protocol):
+    def __call__(self, symbol: Symbol, models: List[EntityModel]):
+        ...
@@ -10,20 +10,20 @@ from modules.models.line import BookUpdateModel
 from modules.models.exchange import ContractModel
 from modules.models.types import PositionId, OrderId, OrderSide, PositionSide, Symbol
 
+logger = logging.getLogger(__name__)
+
 
 class Command(BaseModel):
     contract: ContractModel
     next_time: bool = False
 
+    # Commands are mutated while they are queued (trailing book, next_time), so they are compared by identity:
+    # a content hash would be costly and change under the queue
     def __hash__(self):
-        def _serialize(data: Dict):
-            res = []
-            for a, b in data.items():
-                if isinstance(b, dict):
-                    b = _serialize(b)
-                res.append(f'{a}={b}')
-            return '(' + ';'.join(res) + ')'
-        return hash(_serialize(self.dict()).encode())
+        return id(self)
+
+    def __eq__(self, other):
+        return self is other
 
 
 class TrailingStop(Command):
@@ -49,35 +49,38 @@ class TrailingStop(Command):
 
     def update(self, book: BookUpdateModel):
         triggered = False
-        precision = self.contract.price_decimals
+        # Prices are logged with the contract price precision
+        precision = Decimal(10) ** -self.contract.price_decimals
 
         if book.bid <= 0 or book.ask <= 0:
-            logging.warning('Abnormal price during trailing!')
+            logger.warning('Abnormal price during trailing!')
             return triggered
 
         if self.order_side == OrderSide.BUY:
             if (book.bid + self.stop_size) < self.stop_loss:
                 self.book = book
-                logging.info(f'New low observed: '
-                             f'Updating stop loss to {self.stop_loss:.{precision}f}')
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info('New low observed: Updating stop loss to %s',
+                                self.stop_loss.quantize(precision))
 
             elif book.bid >= self.stop_loss:
                 triggered = True
-                logging.info(f'Buy triggered | '
-                             f'Price: {book.bid:.{precision}f} | '
-                             f'Stop loss: {self.stop_loss:.{precision}f}')
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info('Buy triggered | Price: %s | Stop loss: %s',
+                                book.bid.quantize(precision), self.stop_loss.quantize(precision))
 
         elif self.order_side == OrderSide.SELL:
             if (book.ask - self.stop_size) > self.stop_loss:
                 self.book = book
-                logging.info(f'New high observed: '
-                             f'Updating stop loss to {self.stop_loss:.{precision}f}')
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info('New high observed: Updating stop loss to %s',
+                                self.stop_loss.quantize(precision))
 
             elif book.ask <= self.stop_loss:
                 triggered = True
-                logging.info(f'Sell triggered | '
-                             f'Price: {book.ask:.{precision}f} | '
-                             f'Stop loss: {self.stop_loss:.{precision}f}')
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info('Sell triggered | Price: %s | Stop loss: %s',
+                                book.ask.quantize(precision), self.stop_loss.quantize(precision))
 
         return triggered
 
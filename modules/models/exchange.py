@@ -1,8 +1,9 @@
+import sys
 import time
 from decimal import Decimal
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Callable
 
-from pydantic import BaseModel, validator
+from pydantic import BaseModel, PrivateAttr, validator
 
 from helpers import remove_exponent
 from modules.models.types import (
@@ -42,6 +43,23 @@ class AccountPositionModel(BaseModel):
     isolated: bool
     margin: Decimal
 
+    _calc_pnl: Callable = PrivateAttr()
+
+    def __init__(self, **data):
+        super().__init__(**data)
+
+        # The side never changes, so the PnL formula is chosen once
+        if self.side is PositionSide.LONG:
+            self._calc_pnl = self._calc_pnl_long
+        elif self.side is PositionSide.SHORT:
+            self._calc_pnl = self._calc_pnl_short
+        else:
+            self._calc_pnl = self._calc_pnl_none
+
+    @validator('symbol', pre=True)
+    def validate_symbol(cls, value):
+        return sys.intern(value)
+
     @validator('entry_price', always=True)
     def validate_entry_price(cls, value):
         return remove_exponent(value)
@@ -77,20 +95,24 @@ class AccountPositionModel(BaseModel):
         )
 
     def calc_pnl(self, price, quantity: Optional[Decimal] = None) -> Decimal:
-        pnl = Decimal('0')
+        quantity = quantity or self.quantity
 
         if quantity > self.quantity:
             raise RuntimeError('Invalid quantity!')
 
-        quantity = quantity or self.quantity
+        return self._calc_pnl(self.entry_price, quantity, price)
 
-        if self.side is PositionSide.LONG:
-            pnl = (price.bid - self.entry_price) * quantity
+    @staticmethod
+    def _calc_pnl_long(entry_price: Decimal, quantity: Decimal, price) -> Decimal:
+        return (price.bid - entry_price) * quantity
 
-        elif self.side == PositionSide.SHORT:
-            pnl = (self.entry_price - price.ask) * quantity
+    @staticmethod
+    def _calc_pnl_short(entry_price: Decimal, quantity: Decimal, price) -> Decimal:
+        return (entry_price - price.ask) * quantity
 
-        return pnl
+    @staticmethod
+    def _calc_pnl_none(entry_price: Decimal, quantity: Decimal, price) -> Decimal:
+        return Decimal('0')
 
 
 class AccountModel(BaseModel):
@@ -213,6 +235,10 @@ class OrderModel(BaseModel):
     context: Optional[Dict]
     timestamp: Timestamp
 
+    @validator('symbol', pre=True)
+    def validate_symbol(cls, value):
+        return sys.intern(value)
+
     @property
     def is_filled(self):
         return self.status == OrderStatus.FILLED
@@ -41,6 +41,8 @@ class TradeUpdateModel(BaseModel):
 class BookUpdateModel(BaseModel):
     class Config:
         allow_population_by_field_name = True
+        frozen = True
+        copy_on_model_validation = 'none'
 
     bid: Decimal = Field(..., alias='b')
     ask: Decimal = Field(..., alias='a')
@@ -60,11 +62,7 @@ class BookUpdateModel(BaseModel):
         )
 
     def get_price(self, order_side: OrderSide) -> Decimal:
-        book = {
-            OrderSide.BUY: self.bid,
-            OrderSide.SELL: self.ask,
-        }
-        return book[order_side]
+        return self.bid if order_side is OrderSide.BUY else self.ask
 
     def encode(self):
         return {
@@ -123,17 +121,25 @@ class UpdateLogModel(BaseModel):
     timestamp: Timestamp = Field(..., alias='t')
     data: Dict = Field(..., alias='d')
 
-    def get_entity_model(self) -> Union[TradeUpdateModel, BookUpdateModel, DepthUpdateModel]:
-        model_class = None
+    def encode(self):
+        return {
+            's': self.symbol,
+            'e': self.entity.value,
+            't': self.timestamp,
+            'd': self.data,
+        }
 
-        if self.entity is StreamEntity.TRADE:
-            model_class = TradeUpdateModel
+    def get_entity_model(self) -> Union[TradeUpdateModel, BookUpdateModel, DepthUpdateModel]:
+        return self.decode_entity(self.entity, self.data)
 
-        elif self.entity is StreamEntity.BOOK:
-            model_class = BookUpdateModel
+    @staticmethod
+    def decode_entity(entity: StreamEntity, data: Dict) -> Union[TradeUpdateModel, BookUpdateModel, DepthUpdateModel]:
+        model_class = _ENTITY_MODEL.get(entity)
+        return model_class and model_class.decode(data)
 
-        elif self.entity is StreamEntity.DEPTH:
-            model_class = DepthUpdateModel
 
-        if model_class:
-            return model_class(**self.data)
+_ENTITY_MODEL = {
+    StreamEntity.TRADE: TradeUpdateModel,
+    StreamEntity.BOOK: BookUpdateModel,
+    StreamEntity.DEPTH: DepthUpdateModel,
+}
@@ -1,7 +1,8 @@
+import sys
 from decimal import Decimal
-from typing import List, Optional, Any
+from typing import List, Optional, Any, Callable, Dict
 
-from pydantic import BaseModel, condecimal, validator
+from pydantic import BaseModel, PrivateAttr, condecimal, validator
 from pydantic.types import conint
 
 from modules.models.line import BookUpdateModel
@@ -17,6 +18,10 @@ class StopLossConfig(BaseModel):
 
 class TakeProfitConfig(BaseModel):
     class Step(BaseModel):
+        class Config:
+            extra = 'forbid'
+            frozen = True
+
         level: condecimal(gt=Decimal('0'), le=Decimal('10'))    # 0.1 - 10%, 1 - 100%, 10 - 1000%
         stake: condecimal(gt=Decimal('0'), le=Decimal('1'))
 
@@ -28,7 +33,7 @@ class TakeProfitConfig(BaseModel):
 
     @validator('steps')
     def validate_steps(cls, value):
-        total = sum([i.stake for i in value])
+        total = sum(i.stake for i in value)
 
         if total != 1:
             raise ValueError('The sum of stakes should be equal to 1')
@@ -50,6 +55,30 @@ class PositionModel(BaseModel):
     create_timestamp: Timestamp
     update_timestamp: Optional[Timestamp]
 
+    _calc_pnl: Callable = PrivateAttr()
+    _entry_order_side: OrderSide = PrivateAttr()
+    _exit_order_side: OrderSide = PrivateAttr()
+
+    def __init__(self, **data):
+        super().__init__(**data)
+
+        # The side never changes, so the PnL formula and the order sides are chosen once
+        if self.side is PositionSide.LONG:
+            self._calc_pnl = self._calc_pnl_long
+        elif self.side is PositionSide.SHORT:
+            self._calc_pnl = self._calc_pnl_short
+        else:
+            self._calc_pnl = self._calc_pnl_none
+
+        if self.side is PositionSide.LONG:
+            self._entry_order_side, self._exit_order_side = OrderSide.BUY, OrderSide.SELL
+        else:
+            self._entry_order_side, self._exit_order_side = OrderSide.SELL, OrderSide.BUY
+
+    @validator('symbol', pre=True)
+    def validate_symbol(cls, value):
+        return sys.intern(value)
+
     @property
     def is_open(self):
         return self.status == PositionStatus.OPEN
@@ -59,21 +88,25 @@ class PositionModel(BaseModel):
         return self.status == PositionStatus.CLOSED
 
     def calc_pnl(self, price: BookUpdateModel) -> Decimal:
-        pnl = Decimal('0')
+        return self._calc_pnl(self.entry_price, self.quantity, price)
 
-        if self.side is PositionSide.LONG:
-            pnl = (price.bid - self.entry_price) * self.quantity
+    @staticmethod
+    def _calc_pnl_long(entry_price: Decimal, quantity: Decimal, price: BookUpdateModel) -> Decimal:
+        return (price.bid - entry_price) * quantity
 
-        elif self.side == PositionSide.SHORT:
-            pnl = (self.entry_price - price.ask) * self.quantity
+    @staticmethod
+    def _calc_pnl_short(entry_price: Decimal, quantity: Decimal, price: BookUpdateModel) -> Decimal:
+        return (entry_price - price.ask) * quantity
 
-        return pnl
+    @staticmethod
+    def _calc_pnl_none(entry_price: Decimal, quantity: Decimal, price: BookUpdateModel) -> Decimal:
+        return Decimal('0')
 
     def get_entry_order_side(self) -> OrderSide:
-        return OrderSide.BUY if self.side is PositionSide.LONG else OrderSide.SELL
+        return self._entry_order_side
 
     def get_exit_order_side(self) -> OrderSide:
-        return OrderSide.SELL if self.side is PositionSide.LONG else OrderSide.BUY
+        return self._exit_order_side
 
 
 class StrategyRules(BaseModel):
@@ -95,6 +128,14 @@ class StrategyRules(BaseModel):
         conditions: List[IndicatorCondition]
         save_signal_candles: conint(ge=1, le=10) = 1
 
+        @classmethod
+        def from_trusted(cls, data: Dict):
+            return cls.construct(**{
+                **data,
+                'parameters': [cls.IndicatorParameter.construct(**i) for i in data['parameters']],
+                'conditions': [cls.IndicatorCondition.construct(**i) for i in data['conditions']],
+            })
+
     id: StrategyId
     name: str
 
@@ -113,3 +154,21 @@ class StrategyRules(BaseModel):
 
     stop_loss: Optional[StopLossConfig] = None
     take_profit: Optional[TakeProfitConfig] = None
+
+    @classmethod
+    def from_trusted(cls, data: Dict):
+        """
+        Builds the rules from an in-code config without validation.
+        Configs coming from outside should go through parse_obj.
+        """
+        stop_loss = data.get('stop_loss')
+        take_profit = data.get('take_profit')
+
+        return cls.construct(**{
+            **data,
+            'conditions': [cls.StrategyCondition.from_trusted(i) for i in data['conditions']],
+            'stop_loss': stop_loss and StopLossConfig.construct(**stop_loss),
+            'take_profit': take_profit and TakeProfitConfig.construct(
+                steps=[TakeProfitConfig.Step.construct(**i) for i in take_profit['steps']],
+            ),
+        })
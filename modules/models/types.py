@@ -1,8 +1,93 @@
+import sys
+from types import MappingProxyType
 from typing import NewType, Literal
-from enum import unique, Enum, auto
+from enum import unique, auto
+
+
+class FastEnumMeta(type):
+    """
+    Lightweight replacement for EnumMeta: members are looked up by value
+    and by name with plain dict access instead of going through Enum.__new__.
+    """
+
+    def __new__(mcs, name, bases, namespace):
+        members = {
+            key: value for key, value in namespace.items()
+            if not key.startswith('_') and not hasattr(value, '__get__')
+        }
+        for key in members:
+            del namespace[key]
+
+        cls = super().__new__(mcs, name, bases, namespace)
+        cls._value2member_map_ = {}
+        cls._name2member_map_ = {}
+        cls._member_names_ = []
+
+        for key, value in members.items():
+            if isinstance(value, auto):
+                value = cls._generate_next_value_(key, 1, len(cls._member_names_), list(cls._value2member_map_))
+
+            if type(value) is str:
+                value = sys.intern(value)
+
+            # Same value under another name is an alias of the existing member
+            member = cls._value2member_map_.get(value)
+
+            if member is None:
+                member = str.__new__(cls, value) if issubclass(cls, str) else object.__new__(cls)
+                member._name_ = key
+                member._value_ = value
+                cls._value2member_map_[value] = member
+                cls._member_names_.append(key)
+
+            cls._name2member_map_[key] = member
+            type.__setattr__(cls, key, member)
+
+        return cls
+
+    def __call__(cls, value):
+        try:
+            return cls._value2member_map_[value]
+        except (KeyError, TypeError):
+            if type(value) is cls:
+                return value
+            raise ValueError(f'{value!r} is not a valid {cls.__name__}') from None
+
+    def __getitem__(cls, name):
+        return cls._name2member_map_[name]
+
+    def __contains__(cls, value):
+        return value in cls._value2member_map_
+
+    def __iter__(cls):
+        return iter(cls._value2member_map_.values())
+
+    def __len__(cls):
+        return len(cls._value2member_map_)
+
+    def __setattr__(cls, key, value):
+        if key in cls.__dict__.get('_name2member_map_', ()):
+            raise AttributeError(f'Cannot reassign member {key!r}')
+        super().__setattr__(key, value)
 
+    @property
+    def __members__(cls):
+        return MappingProxyType(cls._name2member_map_)
+
+
+class BaseEnum(metaclass=FastEnumMeta):
+    # noinspection PyMethodParameters
+    def _generate_next_value_(name, start, count, last_values):
+        return start + count
+
+    @property
+    def name(self):
+        return self._name_
+
+    @property
+    def value(self):
+        return self._value_
 
-class BaseEnum(Enum):
     @classmethod
     def keys(cls):
         return cls.__members__.keys()
@@ -11,29 +96,41 @@ class BaseEnum(Enum):
     def values(cls):
         return cls.__members__.values()
 
+    @classmethod
+    def has_value(cls, value):
+        return value in cls._value2member_map_
+
+    @classmethod
+    def __get_validators__(cls):
+        yield cls
+
+    def __repr__(self):
+        return f'<{type(self).__name__}.{self._name_}: {self._value_!r}>'
+
+    def __reduce_ex__(self, protocol):
+        return type(self), (self._value_,)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
 
-class AutoName(str, BaseEnum):
-    """https://docs.python.org/3.8/library/enum.html#using-automatic-values"""
 
+class AutoName(str, BaseEnum):
     # noinspection PyMethodParameters
     def _generate_next_value_(name, start, count, last_values):
         return name.lower()
 
-    @classmethod
-    def has_value(cls, value: str):
-        return value in cls._value2member_map_
+    __repr__ = BaseEnum.__repr__
 
 
 class AutoNameUp(str, BaseEnum):
-    """https://docs.python.org/3.8/library/enum.html#using-automatic-values"""
-
     # noinspection PyMethodParameters
     def _generate_next_value_(name, start, count, last_values):
         return name.upper()
 
-    @classmethod
-    def has_value(cls, value: str):
-        return value in cls._value2member_map_
+    __repr__ = BaseEnum.__repr__
 
 
 PositionId = NewType('PositionId', str)
@@ -70,7 +167,7 @@ class TickType(BaseEnum):
 
 
 @unique
-class MarginType(BaseEnum):
+class MarginType(AutoNameUp):
     ISOLATED = auto()
     CROSSED = auto()
 
@@ -1 +1 @@
-from .client import MongoClient
+from .client import MongoClient, BatchedMongoClient
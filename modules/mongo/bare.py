@@ -1,12 +1,39 @@
 import copy
 import decimal
-from typing import List, Dict, Optional, Tuple, Type
+from functools import lru_cache
+from typing import Any, List, Dict, Optional, Tuple, Type
 
 import pymongo
 from motor.motor_asyncio import AsyncIOMotorClient
 from pydantic import BaseModel
 from pymongo.client_session import ClientSession
 
+# Types that _convert has to look into
+_CONVERTED_TYPES = (dict, list, decimal.Decimal)
+
+
+@lru_cache(maxsize=None)
+def _alias_map(model_class: Type[BaseModel]) -> Tuple[Tuple[str, str], ...]:
+    return tuple((name, field.alias) for name, field in model_class.__fields__.items())
+
+
+@lru_cache(maxsize=None)
+def _has_decimal_fields(model_class: Type[BaseModel]) -> bool:
+    """
+    Whether documents of the model may contain Decimals.
+    Fields that are not typed precisely enough to tell (Any, Dict, Union) count as Decimal.
+    """
+    for field in model_class.__fields__.values():
+        field_type = field.type_
+
+        if field_type is Any or not isinstance(field_type, type) or issubclass(field_type, (decimal.Decimal, dict)):
+            return True
+
+        if issubclass(field_type, BaseModel) and _has_decimal_fields(field_type):
+            return True
+
+    return False
+
 
 class BareMongoClient:  # pragma: no cover
     def __init__(self, mongo_uri: str, indexes: Dict):
@@ -26,7 +53,7 @@ class BareMongoClient:  # pragma: no cover
                 indexes and collection.create_indexes(indexes)
 
     async def disconnect(self):
-        await self._client.close()
+        self._client.close()
 
     async def get(self, model: Type[BaseModel], query: Dict) -> Optional[BaseModel]:
         collection = self._get_collection(model)
@@ -43,8 +70,14 @@ class BareMongoClient:  # pragma: no cover
             query: Dict,
             sort: List[Tuple[str, int]] = None,
             skip: Optional[int] = None,
-            limit: Optional[int] = None
+            limit: Optional[int] = None,
+            batch_size: Optional[int] = None,
+            raw: bool = False
     ):
+        """
+        Streams matching documents, holding at most one batch in memory.
+        With raw=True the documents are yielded as dicts, without building models.
+        """
         collection = self._get_collection(model)
         cursor = collection.find(query)
 
@@ -57,9 +90,16 @@ class BareMongoClient:  # pragma: no cover
         if limit is not None:
             cursor = cursor.limit(limit)
 
-        async for record in cursor:
-            item = self._to_model(model, record)
-            yield item
+        if batch_size is not None:
+            cursor = cursor.batch_size(batch_size)
+
+        if raw:
+            async for record in cursor:
+                yield record
+
+        else:
+            async for record in cursor:
+                yield self._to_model(model, record)
 
     async def find(
             self,
@@ -67,13 +107,33 @@ class BareMongoClient:  # pragma: no cover
             query: Dict,
             sort: List[Tuple[str, int]] = None,
             skip: Optional[int] = None,
-            limit: Optional[int] = None
+            limit: Optional[int] = None,
+            batch_size: Optional[int] = None,
+            raw: bool = False
     ) -> List[BaseModel]:
         result = []
-        async for record in self.find_iter(model, query, sort, skip, limit):
+        async for record in self.find_iter(model, query, sort, skip, limit, batch_size, raw):
             result.append(record)
         return result
 
+    async def aggregate_iter(
+            self,
+            model: Type[BaseModel],
+            pipeline: List[Dict],
+            batch_size: Optional[int] = None
+    ):
+        """
+        Streams the raw documents of an aggregation pipeline run on the model collection.
+        """
+        collection = self._get_collection(model)
+        cursor = collection.aggregate(pipeline)
+
+        if batch_size is not None:
+            cursor = cursor.batch_size(batch_size)
+
+        async for record in cursor:
+            yield record
+
     async def count(
             self,
             model: Type[BaseModel],
@@ -94,7 +154,7 @@ class BareMongoClient:  # pragma: no cover
             session: Optional[ClientSession] = None
     ) -> str:
         collection = self._get_collection(model)
-        data = self._convert(self._to_document(model))
+        data = self._encode(model)
         result = await collection.insert_one(data, session=session)
         return str(result.inserted_id)
 
@@ -105,7 +165,7 @@ class BareMongoClient:  # pragma: no cover
             session: Optional[ClientSession] = None
     ):
         collection = self._get_collection(model)
-        data = self._convert(self._to_document(model))
+        data = self._encode(model)
         return await collection.replace_one(query, data, session=session)
 
     async def partial_update(
@@ -134,7 +194,7 @@ class BareMongoClient:  # pragma: no cover
             session: Optional[ClientSession] = None
     ):
         collection = self._get_collection(model)
-        data = self._convert(self._to_document(model))
+        data = self._encode(model)
         await collection.replace_one(query, data, upsert=True, session=session)
 
     async def delete(
@@ -163,7 +223,7 @@ class BareMongoClient:  # pragma: no cover
                 field = getattr(operation, field_name, None)
 
                 if isinstance(field, model):
-                    value = cls._to_document(field)
+                    value = cls._encode(field)
                     setattr(operation, field_name, value)
 
             result.append(operation)
@@ -176,14 +236,50 @@ class BareMongoClient:  # pragma: no cover
         collection = self._db[collection_name]
         return collection
 
-    def _convert(self, obj):
-        if isinstance(obj, dict):
-            return {key: self._convert(value) for key, value in obj.items()}
-        if isinstance(obj, list):
-            return [self._convert(item) for item in obj]
-        if isinstance(obj, decimal.Decimal):
+    @classmethod
+    def _convert(cls, obj):
+        """
+        Replaces Decimals with strings. Walks nested containers with an explicit stack,
+        copying only the containers that hold something to convert.
+        """
+        obj_type = type(obj)
+
+        if obj_type is decimal.Decimal:
             return str(obj)
-        return obj
+
+        if obj_type is not dict and obj_type is not list:
+            return obj
+
+        root = cls._copy_if_converted(obj)
+        stack = [root] if root is not obj else []
+
+        while stack:
+            container = stack.pop()
+            items = container.items() if type(container) is dict else enumerate(container)
+
+            for key, value in items:
+                value_type = type(value)
+
+                if value_type is decimal.Decimal:
+                    container[key] = str(value)
+
+                elif value_type is dict or value_type is list:
+                    copied = cls._copy_if_converted(value)
+
+                    if copied is not value:
+                        container[key] = copied
+                        stack.append(copied)
+
+        return root
+
+    @staticmethod
+    def _copy_if_converted(container):
+        values = container.values() if type(container) is dict else container
+
+        if any(type(value) in _CONVERTED_TYPES for value in values):
+            return container.copy()
+
+        return container
 
     @staticmethod
     def _get_model_class(model):
@@ -201,6 +297,37 @@ class BareMongoClient:  # pragma: no cover
     def _to_model(model, data):
         return model(**data)
 
-    @staticmethod
-    def _to_document(model):
-        return model.dict(exclude_none=True, by_alias=True)
+    @classmethod
+    def _encode(cls, model):
+        document = cls._to_document(model)
+
+        if _has_decimal_fields(model.__class__):
+            document = cls._convert(document)
+
+        return document
+
+    @classmethod
+    def _to_document(cls, model):
+        """
+        Same as model.dict(exclude_none=True, by_alias=True),
+        without pydantic's generic include/exclude machinery.
+        """
+        document = {}
+
+        for attr, alias in _alias_map(model.__class__):
+            value = getattr(model, attr)
+
+            if value is not None:
+                document[alias] = cls._to_value(value)
+
+        return document
+
+    @classmethod
+    def _to_value(cls, value):
+        if isinstance(value, BaseModel):
+            return cls._to_document(value)
+        if isinstance(value, list):
+            return [cls._to_value(item) for item in value]
+        if isinstance(value, dict):
+            return {key: cls._to_value(item) for key, item in value.items()}
+        return value
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+from typing import List, Dict, Optional, Type
+
+from pydantic import BaseModel
+from pymongo import UpdateOne
+
+from .bare import BareMongoClient
+
+
+class PendingWrite:
+    __slots__ = ('query', 'fields', 'future')
+
+    def __init__(self, query: Dict, fields: Dict):
+        self.query = query
+        self.fields = fields
+        self.future = asyncio.get_event_loop().create_future()
+
+    def to_operation(self):
+        return UpdateOne(self.query, {'$set': self.fields})
+
+
+class BatchedBareMongoClient(BareMongoClient):  # pragma: no cover
+    """
+    Coalesces queued writes into one bulk_write per collection,
+    flushed every `flush_interval_ms` or once `batch_size` writes are pending.
+    Callers await their write until its batch is written, a failed batch raises in every caller.
+    """
+
+    def __init__(self, mongo_uri: str, indexes: Dict, flush_interval_ms: int = 50, batch_size: int = 500):
+        super().__init__(mongo_uri, indexes)
+        self._flush_interval = flush_interval_ms / 1000
+        self._batch_size = batch_size
+        self._pending: Dict[Type[BaseModel], List[PendingWrite]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._stopped = asyncio.Event()
+
+    async def connect(self):
+        await super().connect()
+        self._stopped.clear()
+        self._flush_task = asyncio.get_event_loop().create_task(self._flush_periodically())
+
+    async def disconnect(self):
+        if self._flush_task:
+            # Not cancelled, a flush in progress has to complete
+            self._stopped.set()
+            await self._flush_task
+            self._flush_task = None
+
+        await self.flush()
+        await super().disconnect()
+
+    async def queue_partial_update(self, model: Type[BaseModel], update_fields: Dict, query: Dict):
+        fields = self._convert(update_fields)
+        pending = self._pending.get(model)
+        last = pending and pending[-1]
+
+        # Consecutive $set updates of the same document are merged into one operation
+        if last and last.query == query:
+            last.fields.update(fields)
+            await last.future
+            return
+
+        await self._queue(model, PendingWrite(query, fields))
+
+    async def flush(self):
+        for model in list(self._pending):
+            await self._flush_model(model)
+
+    async def _queue(self, model: Type[BaseModel], write: PendingWrite):
+        pending = self._pending.setdefault(model, [])
+        pending.append(write)
+
+        if len(pending) >= self._batch_size:
+            await self._flush_model(model)
+
+        await write.future
+
+    async def _flush_model(self, model: Type[BaseModel]):
+        writes = self._pending.pop(model, None)
+
+        if not writes:
+            return
+
+        collection = self._get_collection(model)
+
+        try:
+            # Ordered, so that writes to the same document are applied as queued
+            await collection.bulk_write([i.to_operation() for i in writes], ordered=True)
+
+        except asyncio.CancelledError:
+            # Put the writes back in front of the newer ones, so that the next flush applies them
+            self._pending[model] = writes + self._pending.get(model, [])
+            raise
+
+        except Exception as e:
+            logging.error(f'Bulk write of {len(writes)} {model.__name__} operations failed: {e}')
+            for write in writes:
+                write.future.done() or write.future.set_exception(e)
+
+        else:
+            for write in writes:
+                write.future.done() or write.future.set_result(None)
+
+    async def _flush_periodically(self):
+        while not self._stopped.is_set():
+            try:
+                await asyncio.wait_for(self._stopped.wait(), self._flush_interval)
+            except asyncio.TimeoutError:
+                pass
+
+            await self.flush()
@@ -1,9 +1,12 @@
 from .bare import BareMongoClient
+from .batched import BatchedBareMongoClient
 from .proxy import make_proxy
 
 
 __all__ = (
-    'MongoClient'
+    'MongoClient',
+    'BatchedMongoClient',
 )
 
 MongoClient = make_proxy(BareMongoClient)
+BatchedMongoClient = make_proxy(BatchedBareMongoClient)
@@ -8,6 +8,27 @@ import pymongo.errors
 T = TypeVar('T')
 
 
+_CONNECTION_ERRORS = (
+    pymongo.errors.NotMasterError,
+    pymongo.errors.ServerSelectionTimeoutError,
+)
+
+
+async def _run_coro(coro):
+    try:
+        return await coro
+    except _CONNECTION_ERRORS:
+        raise
+
+
+async def _run_agen(agen):
+    try:
+        async for v in agen:
+            yield v
+    except _CONNECTION_ERRORS:
+        raise
+
+
 class MongoProxyObject:
     def __init__(self, klass, *args, **kwargs):
         self._instance = klass(*args, **kwargs)
@@ -20,21 +41,11 @@ class MongoProxyObject:
             instance = func(*args, **kwargs)
 
             if isinstance(instance, types.AsyncGeneratorType):
-                async def inner():
-                    try:
-                        async for v in instance:
-                            yield v
-                    except (pymongo.errors.NotMasterError,
-                            pymongo.errors.ServerSelectionTimeoutError):
-                        raise
-            else:
-                async def inner():
-                    try:
-                        return await instance
-                    except (pymongo.errors.NotMasterError,
-                            pymongo.errors.ServerSelectionTimeoutError):
-                        raise
-            return inner()
+                return _run_agen(instance)
+            return _run_coro(instance)
+
+        # Cache the wrapper, next lookups find it in the instance dict and skip __getattr__
+        self.__dict__[item] = wrapper
         return wrapper
 
 
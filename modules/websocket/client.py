@@ -1,13 +1,19 @@
 import asyncio
 import inspect
 import logging
-from typing import Callable, Dict, Set, Optional
+from typing import Callable, Dict, Optional, Tuple
 
 import orjson
 import aiohttp
 from aiohttp import ClientSession
 from yarl import URL
 
+_dumps = orjson.dumps
+_loads = orjson.loads
+
+# Frames above this size (e.g. depth snapshots) are decoded in a worker thread
+THREADED_DECODE_SIZE = 64 * 1024
+
 
 class WebSocketClient:
     def __init__(
@@ -18,33 +24,31 @@ class WebSocketClient:
     ):
         self._ws: Optional[aiohttp.ClientWebSocketResponse] = None
         self._ready = asyncio.Event()
-        self.session = session or aiohttp.ClientSession()
-        self.callbacks: Dict[str: Set[Callable]] = {}
+        self.session = session
+        # Callbacks are split into plain and coroutine functions once, when they are added
+        self._sync_callbacks: Dict[str, Tuple[Callable, ...]] = {}
+        self._async_callbacks: Dict[str, Tuple[Callable, ...]] = {}
         self._receive_timeout = receive_timeout
         self._reconnect_timeout = reconnect_timeout
         self._task: Optional[asyncio.Task] = None
-        self._loop = asyncio.get_event_loop()
 
     def add_connect_callback(self, cb: Callable):
-        assert callable(cb)
-        self.callbacks.setdefault('connect', set()).add(cb)
+        self._add_callback('connect', cb)
 
     def add_disconnect_callback(self, cb: Callable):
-        assert callable(cb)
-        self.callbacks.setdefault('disconnect', set()).add(cb)
+        self._add_callback('disconnect', cb)
 
     def add_message_callback(self, cb: Callable):
-        assert callable(cb)
-        self.callbacks.setdefault('message', set()).add(cb)
+        self._add_callback('message', cb)
 
     def add_error_callback(self, cb: Callable):
-        assert callable(cb)
-        self.callbacks.setdefault('error', set()).add(cb)
+        self._add_callback('error', cb)
 
     async def send_json(self, data):
         if not self._ready.is_set():
             raise RuntimeError('Websocket is not ready!')
-        await self._ws.send_json(data, dumps=lambda x: orjson.dumps(x).decode())
+        # Binance expects text frames, orjson output is always valid UTF-8
+        await self._ws.send_str(_dumps(data).decode())
 
     async def wait_ready(self):
         await self._ready.wait()
@@ -55,7 +59,12 @@ class WebSocketClient:
 
     async def connect(self, url: URL):
         logging.info('WebSocket: Connection establishing...')
-        self._task = self._loop.create_task(self._fetch(url))
+
+        # Created here rather than in __init__, so that the session is bound to the running loop
+        if self.session is None:
+            self.session = aiohttp.ClientSession()
+
+        self._task = asyncio.create_task(self._fetch(url))
         await self.wait_ready()
 
     async def reconnect(self):
@@ -72,7 +81,11 @@ class WebSocketClient:
                 try:
                     async for msg in ws:
                         if msg.type == aiohttp.WSMsgType.TEXT:
-                            payload = orjson.loads(msg.data)
+                            if len(msg.data) > THREADED_DECODE_SIZE:
+                                # Awaited in place, so messages are still handled in order
+                                payload = await asyncio.to_thread(_loads, msg.data)
+                            else:
+                                payload = _loads(msg.data)
                             await self._trigger_callbacks('message', payload=payload)
 
                         elif msg.type == aiohttp.WSMsgType.PING:
@@ -102,11 +115,31 @@ class WebSocketClient:
                     logging.info('WebSocket: Connection lost!')
                     await asyncio.sleep(self._reconnect_timeout)
 
+    def _add_callback(self, action: str, cb: Callable):
+        assert callable(cb)
+        callbacks = self._async_callbacks if inspect.iscoroutinefunction(cb) else self._sync_callbacks
+        registered = callbacks.get(action, ())
+
+        if cb not in registered:
+            callbacks[action] = (*registered, cb)
+
     async def _trigger_callbacks(self, action, *args, **kwargs):
-        callbacks = self.callbacks.get(action, set())
+        """
+        Plain callbacks run first, in order. Coroutine callbacks then run concurrently,
+        so handlers that must observe messages in order should be a single callback.
+        """
+        for callback in self._sync_callbacks.get(action, ()):
+            callback(*args, **kwargs)
+
+        callbacks = self._async_callbacks.get(action, ())
+
+        if len(callbacks) == 1:
+            await callbacks[0](*args, **kwargs)
 
-        for callback in callbacks:
-            result = callback(*args, **kwargs)
+        elif callbacks:
+            results = await asyncio.gather(*[cb(*args, **kwargs) for cb in callbacks], return_exceptions=True)
 
-            if inspect.isawaitable(result):
-                await result
+            # Let every handler finish, then surface the first failure as before
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
@@ -70,7 +70,7 @@ async def start(orchestrator: StrategiesOrchestrator):
             ]
         }
     }
-    strategy = StrategyRules.parse_obj(data1)
+    strategy = StrategyRules.from_trusted(data1)
     await orchestrator.run_strategy(strategy)
 
     data2 = {
@@ -111,7 +111,7 @@ async def start(orchestrator: StrategiesOrchestrator):
             ]
         }
     }
-    strategy = StrategyRules.parse_obj(data2)
+    strategy = StrategyRules.from_trusted(data2)
     await orchestrator.run_strategy(strategy)
 
 
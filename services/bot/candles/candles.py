@@ -1,145 +1,168 @@
+from collections import deque
 from datetime import timedelta, datetime
+from itertools import repeat
 from decimal import Decimal
-from typing import List, Optional, Dict, Union
+from typing import List, Optional, Dict, Union, Deque
 
 from modules.models import CandleModel, TradeUpdateModel
-from modules.models.types import Timeframe, TickType
+from modules.models.types import Timeframe, TickType, Timestamp
 
 from .constants import TIMEFRAME_S
 from .technical import TechnicalAnalysis
 
 
+def _float_to_decimal(value: float) -> Decimal:
+    # repr gives the shortest string that round-trips, e.g. 0.1 rather than 0.1000000000000000055...
+    return Decimal(repr(value))
+
+
 class Candles:
     def __init__(self, timeframe: Timeframe, candles_limit: int = 100):
         self.timeframe_ms = TIMEFRAME_S[timeframe] * 1000
         self._technical = TechnicalAnalysis(timeframe)
         self._candles_limit = candles_limit
-        self._raw: List[Dict] = []
+
+        # Candles are stored column-wise as floats, CandleModel (Decimal) is only built on access.
+        # Bounded deques drop the oldest candle on append once the limit is reached.
+        self._timestamp: Deque[Timestamp] = deque(maxlen=candles_limit)
+        self._open: Deque[float] = deque(maxlen=candles_limit)
+        self._high: Deque[float] = deque(maxlen=candles_limit)
+        self._low: Deque[float] = deque(maxlen=candles_limit)
+        self._close: Deque[float] = deque(maxlen=candles_limit)
+        self._volume: Deque[float] = deque(maxlen=candles_limit)
 
     def __len__(self):
-        return len(self._raw)
+        return len(self._timestamp)
 
     def __getitem__(self, item) -> Optional[Union[CandleModel, List[CandleModel]]]:
+        indexes = range(len(self))
+
+        if isinstance(item, slice):
+            return [self._get_candle(i) for i in indexes[item]] or None
+
         try:
-            res = self._raw[item]
+            return self._get_candle(indexes[item])
         except IndexError:
-            res = None
-
-        rows: List[Dict] = res if isinstance(res, list) else [res] if res else []
-        candles = [CandleModel(**i) for i in rows]
-        return candles[0] if candles else candles or None
+            return None
 
     def __getattr__(self, item):
         if self._technical.df is None:
-            self._technical.build_dataframe(self._raw)
+            self._technical.build_dataframe(self._get_columns())
+        else:
+            self._technical.refresh()
         return getattr(self._technical, item)
 
     def set_snapshot(self, candles: List[CandleModel]):
-        self._raw.clear()
+        for column in self._get_columns().values():
+            column.clear()
+        self._technical.reset()
+
         candles = candles[-self._candles_limit:]
 
         for prev, cur in zip(candles, candles[1:]):
-            self._append(prev)
+            price = float(prev.close)
+            self._append(prev.timestamp, float(prev.open), float(prev.high), float(prev.low), price, float(prev.volume))
             missing_cnt = int((cur.timestamp - prev.timestamp) / self.timeframe_ms) - 1
 
             # Filling in gaps in a snapshot
-            for n in range(1, missing_cnt + 1):
-                new_ts = prev.timestamp + self.timeframe_ms * n
-                price = prev.close
-                new_candle = CandleModel(
-                    timestamp=new_ts,
-                    open=price,
-                    high=price,
-                    low=price,
-                    close=price,
-                    volume=0
-                )
-                self._append(new_candle)
+            self._fill_gap(prev.timestamp, missing_cnt, price)
 
     def update(self, model: TradeUpdateModel) -> Optional[TickType]:
-        tick_type = None
-        last_candle = self._raw and CandleModel(**self._raw[-1])
+        price = float(model.price)
 
-        if not last_candle:
+        if not self._timestamp:
             t = datetime.fromtimestamp(model.timestamp / 1000)
             dt = t.replace(second=0, microsecond=0, minute=0, hour=t.hour) + timedelta(hours=t.minute // 30)
             ts = int(dt.timestamp() * 1000)
-            last_candle = CandleModel(
-                timestamp=ts,
-                open=model.price,
-                high=model.price,
-                low=model.price,
-                close=model.price,
-                volume=0,
-            )
-            self._append(last_candle)
+            self._append(ts, price, price, price, price, 0.0)
             return None
 
+        timestamp = model.timestamp
+        last_ts = self._timestamp[-1]
+        next_ts = last_ts + self.timeframe_ms
+
         # Same candle
-        if model.timestamp < last_candle.timestamp + self.timeframe_ms:
+        if timestamp < next_ts:
             tick_type = TickType.SAME_CANDLE
-            volume = last_candle.volume + model.quantity
-            self._update(index=-1, close=model.price, volume=volume)
+            volume = self._volume[-1] + float(model.quantity)
+            self._close[-1] = price
+            self._volume[-1] = volume
 
-            if model.price > last_candle.high:
-                last_candle.high = model.price
+            if price > self._high[-1]:
+                self._high[-1] = price
 
-            elif model.price < last_candle.low:
-                last_candle.low = model.price
+            elif price < self._low[-1]:
+                self._low[-1] = price
+
+            self._technical.update_last_row(self._high[-1], self._low[-1], price, volume)
 
         # Missing candles
-        elif model.timestamp >= last_candle.timestamp + self.timeframe_ms * 2:
+        elif timestamp >= next_ts + self.timeframe_ms:
             tick_type = TickType.MISSING_CANDLE
-            missing_cnt = int((model.timestamp - last_candle.timestamp) / self.timeframe_ms) - 1
-
-            for n in range(1, missing_cnt + 1):
-                new_ts = last_candle.timestamp + self.timeframe_ms * n
-                price = last_candle.close
-                new_candle = CandleModel(
-                    timestamp=new_ts,
-                    open=price,
-                    high=price,
-                    low=price,
-                    close=price,
-                    volume=0,
-                )
-                self._append(new_candle)
+            missing_cnt = int((timestamp - last_ts) / self.timeframe_ms) - 1
+            self._fill_gap(last_ts, missing_cnt, self._close[-1])
+
+            # Several candles were added, rebuild the dataframe on the next access
+            self._technical.reset()
 
         # New candle
-        elif model.timestamp >= last_candle.timestamp + self.timeframe_ms:
+        else:
             tick_type = TickType.NEW_CANDLE
-            new_ts = last_candle.timestamp + self.timeframe_ms
-            new_candle = CandleModel(
-                timestamp=new_ts,
-                open=model.price,
-                high=model.price,
-                low=model.price,
-                close=model.price,
-                volume=model.quantity,
-            )
-            self._append(new_candle)
-
-        if tick_type:
-            self._technical.reset()
+            volume = float(model.quantity)
+            self._append(next_ts, price, price, price, price, volume)
 
-        if tick_type is TickType.NEW_CANDLE:
             if self._technical.df is None:
-                self._technical.build_dataframe(self._raw)
+                self._technical.build_dataframe(self._get_columns())
+            else:
+                self._technical.append_row(next_ts, price, price, price, price, volume, size=len(self))
+                self._technical.refresh()
 
         return tick_type
 
-    def _append(self, candle: CandleModel):
-        self._raw.append(candle.dict())
-
-        if len(self._raw) > self._candles_limit:
-            self._raw.pop(0)
-
-    def _update(self, index: int, close: Decimal, volume: Decimal):
-        self._raw[index]['close'] = close
-        self._raw[index]['volume'] = volume
-
-        if close < self._raw[index]['low']:
-            self._raw[index]['low'] = close
-
-        if close > self._raw[index]['high']:
-            self._raw[index]['high'] = close
+    def _get_columns(self) -> Dict[str, Deque]:
+        return {
+            'timestamp': self._timestamp,
+            'open': self._open,
+            'high': self._high,
+            'low': self._low,
+            'close': self._close,
+            'volume': self._volume,
+        }
+
+    def _get_candle(self, index: int) -> CandleModel:
+        # Values come from validated models and trades, no need to validate them again
+        return CandleModel.construct(
+            timestamp=self._timestamp[index],
+            open=_float_to_decimal(self._open[index]),
+            high=_float_to_decimal(self._high[index]),
+            low=_float_to_decimal(self._low[index]),
+            close=_float_to_decimal(self._close[index]),
+            volume=_float_to_decimal(self._volume[index]),
+        )
+
+    def _append(
+            self,
+            timestamp: Timestamp,
+            open_: float,
+            high: float,
+            low: float,
+            close: float,
+            volume: float
+    ):
+        self._timestamp.append(timestamp)
+        self._open.append(open_)
+        self._high.append(high)
+        self._low.append(low)
+        self._close.append(close)
+        self._volume.append(volume)
+
+    def _fill_gap(self, last_ts: Timestamp, count: int, price: float):
+        """
+        Appends `count` flat candles with no volume after `last_ts`, column by column.
+        """
+        self._timestamp.extend(range(last_ts + self.timeframe_ms, last_ts + self.timeframe_ms * (count + 1), self.timeframe_ms))
+
+        for column in (self._open, self._high, self._low, self._close):
+            column.extend(repeat(price, count))
+
+        self._volume.extend(repeat(0.0, count))
@@ -21,3 +21,6 @@ TIMEFRAME_S = {
     '6h': 21600,
     '1d': 86400,
 }
+
+# candle columns stored as floats
+PRICE_COLUMNS = ('low', 'high', 'open', 'close', 'volume')
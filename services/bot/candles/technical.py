@@ -1,8 +1,8 @@
-from typing import Optional, List, Tuple, Dict
+from functools import lru_cache
+from typing import Optional, List, Tuple, Dict, Sequence
 from decimal import Decimal
 
 import numpy as np
-import pandas
 import pandas as pd
 from matplotlib import pyplot as plt
 
@@ -10,7 +10,42 @@ from helpers import to_decimal
 
 from modules.models.types import Timeframe
 
-from .constants import TIMEFRAME_FREQ
+from .constants import TIMEFRAME_FREQ, PRICE_COLUMNS
+
+# ROC thresholds (%) of the pump/dump signal levels 1-5
+SIGNAL_THRESHOLDS = np.array([6, 9, 12, 20, 30])
+
+
+@lru_cache(maxsize=4096)
+def _to_decimal(value: float) -> Decimal:
+    # Only the last candle changes between ticks, so most indicator values repeat
+    return to_decimal(value)
+
+
+def _shift(values: np.ndarray, periods: int) -> np.ndarray:
+    """
+    Same as Series.shift(periods) for a float array, without building a Series.
+    """
+    result = np.empty_like(values)
+    result[:periods] = np.nan
+    result[periods:] = values[:-periods]
+    return result
+
+
+def _ewm_mean(values: np.ndarray, **kwargs) -> np.ndarray:
+    """
+    Exponentially weighted mean of a float array, the recurrence itself runs in pandas' compiled code.
+    """
+    return pd.Series(values).ewm(**kwargs).mean().to_numpy()
+
+
+def _rising_edges(flags: np.ndarray) -> np.ndarray:
+    """
+    True where the flag turns on. The first row has nothing before it, so it counts if the flag is set.
+    """
+    edges = flags.copy()
+    edges[1:] &= ~flags[:-1]
+    return edges
 
 
 class TechnicalAnalysis:
@@ -18,6 +53,17 @@ class TechnicalAnalysis:
         self.timeframe_freq = TIMEFRAME_FREQ[timeframe]
         self._df = None
         self._initial_columns = {'timestamp', 'low', 'high', 'open', 'close', 'volume'}
+        self._is_stale = False
+        self._last_row: Optional[Tuple[float, float, float, float]] = None
+
+        # Calculated indicator -> parameters it was calculated with
+        self._computed: Dict[str, Tuple] = {}
+
+        # Candle columns as float arrays, extracted once per dataframe
+        self._arrays: Dict[str, np.ndarray] = {}
+
+        # Columns read by _get, dropped whenever an indicator is (re)calculated
+        self._values: Dict[str, np.ndarray] = {}
 
     def __bool__(self):
         return bool(self._df)
@@ -28,30 +74,90 @@ class TechnicalAnalysis:
 
     def reset(self):
         self._df = None
+        self._is_stale = False
+        self._last_row = None
+        self._invalidate()
 
-    def build_dataframe(self, raw: List[Dict]):
-        df = pd.DataFrame(data=raw, columns=self._initial_columns)
+    def build_dataframe(self, columns: Dict[str, Sequence]):
+        # Columns are converted to typed arrays once, without per-row type inference and astype copies
+        timestamp = np.fromiter(columns['timestamp'], dtype=np.int64, count=len(columns['timestamp']))
 
         # Convert the DataFrame into a time series with the date as the index/key
-        idx = pd.to_datetime(df['timestamp'], unit='ms')
-        tsidx = pd.DatetimeIndex(idx, dtype='datetime64[ns]', freq=self.timeframe_freq)
-        df.set_index(tsidx, inplace=True)
-        df = df.drop(columns=['timestamp'])
-        df.index.names = ['ts']
+        tsidx = pd.DatetimeIndex(
+            timestamp.astype('datetime64[ms]'), dtype='datetime64[ns]', freq=self.timeframe_freq, name='ts')
+
+        df = pd.DataFrame(
+            data={
+                name: np.fromiter(columns[name], dtype=np.float64, count=len(columns[name]))
+                for name in PRICE_COLUMNS
+            },
+            index=tsidx,
+        )
         df['timestamp'] = tsidx
 
-        # Correct column types
-        df['low'] = df['low'].astype(float)
-        df['high'] = df['high'].astype(float)
-        df['open'] = df['open'].astype(float)
-        df['close'] = df['close'].astype(float)
-        df['volume'] = df['volume'].astype(float)
+        self._df = df
+        self._is_stale = False
+        self._last_row = None
+        self._invalidate()
+        self._set_indicators()
 
-        # Reset pandas dataframe index
-        df.reset_index()
+    def update_last_row(self, high: float, low: float, close: float, volume: float):
+        """
+        Updates the last candle, the change is applied to the dataframe on the next refresh().
+        """
+        if self._df is None:
+            return
 
-        self._df = df
+        self._last_row = (high, low, close, volume)
+        self._is_stale = True
+
+    def append_row(self, timestamp: int, open_: float, high: float, low: float, close: float, volume: float, size: int):
+        """
+        Appends a candle keeping the last `size` rows, indicators are recalculated on the next refresh().
+        """
+        if self._df is None:
+            return
+
+        ts = pd.to_datetime(timestamp, unit='ms')
+        row = pd.DataFrame(
+            data={'low': low, 'high': high, 'open': open_, 'close': close, 'volume': volume, 'timestamp': ts},
+            index=pd.DatetimeIndex([ts], name='ts'),
+        )
+        self._apply_last_row()
+        self._df = pd.concat([self._get_candles_frame(), row]).iloc[-size:].copy()
+        self._is_stale = True
+        self._invalidate()
+
+    def refresh(self):
+        """
+        Recalculates indicators after the candles were changed in place.
+        Indicator columns are kept and overwritten, inserting them again costs more than calculating them.
+        Columns calculated on demand stay outdated until they are requested again.
+        """
+        if not self._is_stale:
+            return
+
+        self._apply_last_row()
+        self._is_stale = False
+        self._invalidate()
+        self._set_indicators()
+
+    def _invalidate(self):
+        self._computed.clear()
+        self._arrays.clear()
+        self._values.clear()
+
+    def _apply_last_row(self):
+        if self._last_row is not None:
+            columns = self._df.columns.get_indexer(['high', 'low', 'close', 'volume'])
+            self._df.iloc[-1, columns] = self._last_row
+            self._last_row = None
+
+    def _get_candles_frame(self):
+        # Candle columns only, without the calculated indicators
+        return self._df[[i for i in self._df.columns if i in self._initial_columns]].copy()
 
+    def _set_indicators(self):
         self._set_rsi(14)
         self._set_roc(14)
         self._set_ma(12)
@@ -76,43 +182,37 @@ class TechnicalAnalysis:
     def get_ma(self, index: int = -1, period: int = 12) -> Dict:
         self._set_ma(period)
 
-        ma = self._get(f'ma', index)
+        ma = self._get(f'ma_{period}', index)
 
         return {
-            'ma': ma and to_decimal(ma)
+            'ma': ma and _to_decimal(ma)
         }
 
     def get_ema(self, index: int = -1, period: int = 12) -> Dict:
         self._set_ema(period)
 
-        ema = self._get('ema', index)
+        ema = self._get(f'ema_{period}', index)
 
         return {
-            'ema': ema and to_decimal(ema)
+            'ema': ema and _to_decimal(ema)
         }
 
     def get_rsi(self, index: int = -1, period: int = 14) -> Dict:
-        key = f'rsi_{period}'
-
-        if key not in self._df:
-            self._set_rsi(period)
+        self._set_rsi(period)
 
         rsi = self._get(f'rsi_{period}', index)
 
         return {
-            'rsi': rsi and to_decimal(rsi)
+            'rsi': rsi and _to_decimal(rsi)
         }
 
     def get_roc(self, index: int = -1, period: int = 18) -> Dict:
-        key = f'roc_{period}'
+        self._set_roc(period)
 
-        if key not in self._df:
-            self._set_roc(period)
-
-        roc = self._get(key, index)
+        roc = self._get(f'roc_{period}', index)
 
         return {
-            'roc': roc and to_decimal(roc)
+            'roc': roc and _to_decimal(roc)
         }
 
     def get_stochastic(self, index: int = -1, k_period: int = 14, d_period: int = 3) -> Dict[str, Optional[Decimal]]:
@@ -122,25 +222,23 @@ class TechnicalAnalysis:
         d = self._get(f'%D', index)
 
         return {
-            '%K': k and to_decimal(k),
-            '%D': d and to_decimal(d),
+            '%K': k and _to_decimal(k),
+            '%D': d and _to_decimal(d),
         }
 
     def get_obv(self, index: int = -1) -> Dict[str, Optional[Decimal]]:
-        if 'obv' not in self._df or 'obv_pc' not in self._df:
-            self._set_obv()
+        self._set_obv()
 
         obv = self._get('obv', index)
         obv_pc = self._get('obv_pc', index)
 
         return {
-            'obv': obv and to_decimal(obv),
-            'obv_pc': obv_pc and to_decimal(obv_pc),
+            'obv': obv and _to_decimal(obv),
+            'obv_pc': obv_pc and _to_decimal(obv_pc),
         }
 
     def get_eri_signals(self, index: int = -1) -> Dict[str, bool]:
-        if 'eri_buy' not in self._df or 'eri_sell' not in self._df:
-            self._set_eri_signals()
+        self._set_eri_signals()
 
         return {
             'eri_buy': bool(self._get('eri_buy', index)),
@@ -201,9 +299,9 @@ class TechnicalAnalysis:
         bb_lower = self._get('bb_l', index)
 
         return {
-            'bb_upper': bb_upper and to_decimal(bb_upper),
-            'bb_ma': bb_ma and to_decimal(bb_ma),
-            'bb_lower': bb_lower and to_decimal(bb_lower)
+            'bb_upper': bb_upper and _to_decimal(bb_upper),
+            'bb_ma': bb_ma and _to_decimal(bb_ma),
+            'bb_lower': bb_lower and _to_decimal(bb_lower)
         }
 
     def get_bollinger_bands_signals(self, index: int = -1, length: int = 20, width: int = 2):
@@ -266,70 +364,84 @@ class TechnicalAnalysis:
     def get_pump_level(self, index: int = -1, period: int = 18, sensitivity_factor: int = 1) -> int:
         self._set_pump_signal(period, sensitivity_factor)
 
-        levels = [self._get(f'level_{n}_pump_signal', index) for n in range(1, 6)]
-        return levels.index(True) + 1 if True in levels else 0
+        return int(self._get(f'pump_level_{period}_{sensitivity_factor}', index) or 0)
 
     def get_dump_level(self, index: int = -1, period: int = 18, sensitivity_factor: int = 1) -> int:
         self._set_dump_signal(period, sensitivity_factor)
 
-        levels = [self._get(f'level_{n}_dump_signal', index) for n in range(1, 6)]
-        return levels.index(True) + 1 if True in levels else 0
+        return int(self._get(f'dump_level_{period}_{sensitivity_factor}', index) or 0)
 
     def _set_rsi(self, period: int):
         """
         Calculates the Relative Strength Index.
         :return: The RSI value of the previous candlestick
         """
-        delta = self._df['close'].diff().dropna()
-        up, down = delta.copy(), delta.copy()
-        up[up < 0] = 0
-        down[down > 0] = 0
-        avg_gain = up.ewm(com=(period - 1), min_periods=period).mean()
-        avg_loss = down.abs().ewm(com=(period - 1), min_periods=period).mean()
-        rs = avg_gain / avg_loss
-        rsi = 100 - 100 / (1 + rs)
-        rsi.round(2)
+        if self._is_computed(f'rsi_{period}'):
+            return
+
+        # The first delta is NaN, which ewm skips just like the dropped row
+        close, = self._get_arrays('close')
+        delta = np.diff(close, prepend=np.nan)
+
+        # Gains and losses are smoothed together in a single ewm pass
+        changes = pd.DataFrame({'gain': np.maximum(delta, 0), 'loss': np.maximum(-delta, 0)})
+        averages = changes.ewm(com=(period - 1), min_periods=period).mean().to_numpy()
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = 100 - 100 / (1 + averages[:, 0] / averages[:, 1])
 
-        key = f'rsi_{period}'
-        self._df[key] = rsi
+        self._df[f'rsi_{period}'] = rsi
 
     def _set_roc(self, period: int):
         """
         Calculates the rate of change
         """
         key = f'roc_{period}'
-        self._df[key] = self._df['close'].diff(period) / self._df['close'].shift(period) * 100
+
+        if self._is_computed(key):
+            return
+
+        close, = self._get_arrays('close')
+        prev_close = _shift(close, period)
+        self._df[key] = (close - prev_close) / prev_close * 100
 
     def _set_stochastic(self, k_period, d_period):
-        self._df[f'n_high'] = self._df['high'].rolling(k_period).max()
-        self._df[f'n_low'] = self._df['low'].rolling(k_period).min()
+        if self._is_computed('stochastic', k_period, d_period):
+            return
 
-        self._df[f'%K'] = (self._df['close'] - self._df[f'n_low']) * 100 / (self._df[f'n_high'] - self._df[f'n_low'])
+        close, = self._get_arrays('close')
+        n_high = self._df['high'].rolling(k_period).max().to_numpy()
+        n_low = self._df['low'].rolling(k_period).min().to_numpy()
+
+        self._df['n_high'] = n_high
+        self._df['n_low'] = n_low
+        self._df[f'%K'] = (close - n_low) * 100 / (n_high - n_low)
         self._df[f'%D'] = self._df[f'%K'].rolling(d_period).mean()
 
     def _set_macd(self, fast_length: int = 12, slow_length: int = 26, signal_smoothing: int = 9):
         """
         Calculates the MACD and its Signal line.
         """
-        ema_fast_key = f'ema_{fast_length}'
-        ema_slow_key = f'ema_{slow_length}'
-
-        if ema_fast_key not in self._df:
-            self._set_ema(fast_length)
+        if self._is_computed('macd', fast_length, slow_length, signal_smoothing):
+            return
 
-        if ema_slow_key not in self._df:
-            self._set_ema(slow_length)
+        self._set_ema(fast_length)
+        self._set_ema(slow_length)
 
         # Exponential Moving Average method
-        ema_fast = self._df[ema_fast_key]
-        ema_slow = self._df[ema_slow_key]
+        ema_fast = self._df[f'ema_{fast_length}'].to_numpy()
+        ema_slow = self._df[f'ema_{slow_length}'].to_numpy()
+        macd = ema_fast - ema_slow
 
-        self._df['macd'] = ema_fast - ema_slow
-        self._df['macd_signal'] = self._df['macd'].ewm(span=signal_smoothing).mean()
+        self._df['macd'] = macd
+        self._df['macd_signal'] = _ewm_mean(macd, span=signal_smoothing)
 
     def _set_ma(self, period: int = 12):
         assert 200 >= period >= 5
 
+        if self._is_computed(f'ma_{period}'):
+            return
+
         self._df[f'ma_{period}'] = self._df['close'].rolling(window=period).mean()
 
     def _set_ema(self, period: int = 12):
@@ -338,7 +450,11 @@ class TechnicalAnalysis:
         """
         assert 200 >= period >= 5
 
-        self._df[f'ema_{period}'] = self._df['close'].ewm(span=period, adjust=False).mean()
+        if self._is_computed(f'ema_{period}'):
+            return
+
+        close, = self._get_arrays('close')
+        self._df[f'ema_{period}'] = _ewm_mean(close, span=period, adjust=False)
 
     def _set_sma(self, period: int = 12):
         """
@@ -346,33 +462,60 @@ class TechnicalAnalysis:
         """
         assert 200 >= period >= 5
 
+        if self._is_computed(f'sma_{period}'):
+            return
+
         self._df[f'sma_{period}'] = self._df['close'].rolling(period, min_periods=1).mean()
 
     def _set_obv(self):
         """
         Calculates On-Balance Volume (OBV)
         """
-        self._df['obv'] = np.where(
-            self._df['close'] == self._df['close'].shift(1), 0,
-            np.where(self._df['close'] > self._df['close'].shift(1), self._df['volume'],
-                     np.where(self._df['close'] < self._df['close'].shift(1), -self._df['volume'],
-                              self._df.iloc[0].volume))).cumsum()
-        self._df['obv_pc'] = np.round(pd.Series(self._df['obv']).pct_change().fillna(0), 2)
+        if self._is_computed('obv'):
+            return
+
+        close, volume = self._get_arrays('close', 'volume')
+
+        # The volume is added on a rise, subtracted on a fall, the first candle counts as a rise
+        direction = np.sign(np.diff(close, prepend=np.nan))
+        direction[:1] = 1
+        obv = np.cumsum(direction * volume)
+
+        obv_pc = np.zeros_like(obv)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            np.divide(obv[1:], obv[:-1], out=obv_pc[1:])
+
+        obv_pc[1:] -= 1
+
+        # 0 / 0 is no change
+        obv_pc[np.isnan(obv_pc)] = 0
+
+        self._df['obv'] = obv
+        self._df['obv_pc'] = np.round(obv_pc, 2, out=obv_pc)
 
     def _set_eri(self):
         """
         Calculates Elder Ray Index (ERI)
         """
-        if 'ema_13' not in self._df:
-            self._set_ema(13)
+        if self._is_computed('eri'):
+            return
 
-        self._df['bull_power'] = self._df['high'] - self._df['ema_13']
-        self._df['bear_power'] = self._df['low'] - self._df['ema_13']
+        self._set_ema(13)
+
+        high, low = self._get_arrays('high', 'low')
+        ema = self._df['ema_13'].to_numpy()
+
+        self._df['bull_power'] = high - ema
+        self._df['bear_power'] = low - ema
 
     def _set_ichimoku(self):
         """
         Calculates the ichimoku cloud
         """
+        if self._is_computed('ichimoku'):
+            return
+
         # Tenkan-sen (Conversion Line): (9-period high + 9-period low)/2))
         period9_high = self._df['high'].rolling(window=9).max()
         period9_low = self._df['low'].rolling(window=9).min()
@@ -387,9 +530,12 @@ class TechnicalAnalysis:
         self._df['senkou_span_a'] = ((self._df.tenkan_sen + self._df.kijun_sen) / 2).shift(26)
 
         # Senkou Span B (Leading Span B): (52-period high + 52-period low)/2))
-        self._df['period52_high'] = self._df['high'].rolling(window=52).max()
-        self._df['period52_low'] = self._df['low'].rolling(window=52).min()
-        self._df['senkou_span_b'] = ((self._df.period52_high + self._df.period52_low) / 2).shift(26)
+        # A 52-period window is two adjacent 26-period ones, no need for another rolling pass
+        period52_high = np.maximum(period26_high, period26_high.shift(26))
+        period52_low = np.minimum(period26_low, period26_low.shift(26))
+        self._df['period52_high'] = period52_high
+        self._df['period52_low'] = period52_low
+        self._df['senkou_span_b'] = ((period52_high + period52_low) / 2).shift(26)
 
         # The most current closing price plotted 22 time periods behind (optional)
         self._df['chikou_span'] = self._df['close'].shift(-22)  # 22 according to investopedia
@@ -398,239 +544,331 @@ class TechnicalAnalysis:
         """
         Calculates Bollinger Bands
         """
-        self._df['bb_tp'] = (self._df['high'] + self._df['low'] + self._df['close']) / 3
-        self._df['bb_ma'] = self._df['bb_tp'].rolling(length, min_periods=length).mean()
-        self._df['bb_sigma'] = self._df['bb_tp'].rolling(length, min_periods=length).std()
-        self._df['bb_u'] = self._df['bb_ma'] + width * self._df['bb_sigma']
-        self._df['bb_l'] = self._df['bb_ma'] - width * self._df['bb_sigma']
+        if self._is_computed('bollinger_bands', length, width):
+            return
+
+        high, low, close = self._get_arrays('high', 'low', 'close')
+
+        tp = pd.Series((high + low + close) / 3, index=self._df.index)
+        rolling = tp.rolling(length, min_periods=length)
+        ma = rolling.mean().to_numpy()
+        sigma = rolling.std().to_numpy()
+
+        self._df['bb_tp'] = tp
+        self._df['bb_ma'] = ma
+        self._df['bb_sigma'] = sigma
+        self._df['bb_u'] = ma + width * sigma
+        self._df['bb_l'] = ma - width * sigma
 
     def _set_candle_shooting_star(self):
         """
         Candlestick Detected: Shooting Star ("Weak - Reversal - Bearish Pattern - Down")
         """
 
+        if self._is_computed('shooting_star'):
+            return
+
+        o, h, l, c = self._get_arrays('open', 'high', 'low', 'close')
+        o1, c1 = self._get_shifted('open', 1), self._get_shifted('close', 1)
+        body = np.abs(o - c)
+
         self._df['shooting_star'] = (
-                ((self._df['open'].shift(1) < self._df['close'].shift(1)) & (
-                        self._df['close'].shift(1) < self._df['open']))
-                & (self._df['high'] - np.maximum(self._df['open'], self._df['close']) >= (
-                abs(self._df['open'] - self._df['close']) * 3))
-                & ((np.minimum(self._df['close'], self._df['open']) - self._df['low']) <= abs(
-            self._df['open'] - self._df['close'])))
+                ((o1 < c1) & (c1 < o))
+                & (h - np.maximum(o, c) >= body * 3)
+                & ((np.minimum(c, o) - l) <= body))
 
     def _set_candle_hanging_man(self):
         """
         Candlestick Detected: Hanging Man ("Weak - Continuation - Bearish Pattern - Down")
         """
 
+        if self._is_computed('hanging_man'):
+            return
+
+        o, h, l, c = self._get_arrays('open', 'high', 'low', 'close')
+        size = .001 + h - l
+
         self._df['hanging_man'] = (
-                ((self._df['high'] - self._df['low']) > (4 * (self._df['open'] - self._df['close'])))
-                & (((self._df['close'] - self._df['low']) / (.001 + self._df['high'] - self._df['low'])) >= 0.75)
-                & (((self._df['open'] - self._df['low']) / (.001 + self._df['high'] - self._df['low'])) >= 0.75)
-                & (self._df['high'].shift(1) < self._df['open'])
-                & (self._df['high'].shift(2) < self._df['open']))
+                ((h - l) > (4 * (o - c)))
+                & (((c - l) / size) >= 0.75)
+                & (((o - l) / size) >= 0.75)
+                & (self._get_shifted('high', 1) < o)
+                & (self._get_shifted('high', 2) < o))
 
     def _set_candle_evening_star(self):
         """
         Candlestick Detected: Evening Star ("Strong - Reversal - Bearish Pattern - Down")
         """
 
+        if self._is_computed('evening_star'):
+            return
+
+        o, c = self._get_arrays('open', 'close')
+        o2, c2 = self._get_shifted('open', 2), self._get_shifted('close', 2)
+        body1_low = np.minimum(self._get_shifted('open', 1), self._get_shifted('close', 1))
+
         self._df['evening_star'] = (
-                ((np.minimum(self._df['open'].shift(1), self._df['close'].shift(1)) > self._df['close'].shift(2))
-                 & (self._df['close'].shift(2) > self._df['open'].shift(2)))
-                & ((self._df['close'] < self._df['open'])
-                   & (self._df['open'] < np.minimum(self._df['open'].shift(1), self._df['close'].shift(1)))))
+                ((body1_low > c2) & (c2 > o2))
+                & ((c < o) & (o < body1_low)))
 
     def _set_candle_hammer(self):
         """* Candlestick Detected: Hammer ("Weak - Reversal - Bullish Signal - Up"""
+        if self._is_computed('hammer'):
+            return
+
+        o, h, l, c = self._get_arrays('open', 'high', 'low', 'close')
+        size = .001 + h - l
 
         self._df['hammer'] = (
-                ((self.df['high'] - self.df['low']) > 3 * (self.df['open'] - self.df['close']))
-                & (((self.df['close'] - self.df['low']) / (.001 + self.df['high'] - self.df['low'])) > 0.6)
-                & (((self.df['open'] - self.df['low']) / (.001 + self.df['high'] - self.df['low'])) > 0.6))
+                ((h - l) > 3 * (o - c))
+                & (((c - l) / size) > 0.6)
+                & (((o - l) / size) > 0.6))
 
     def _set_candle_inverted_hammer(self):
         """
         Candlestick Detected: Inverted Hammer ("Weak - Continuation - Bullish Pattern - Up")
         """
 
+        if self._is_computed('inverted_hammer'):
+            return
+
+        o, h, l, c = self._get_arrays('open', 'high', 'low', 'close')
+        size = .001 + h - l
+
         self._df['inverted_hammer'] = (
-                ((self._df['high'] - self._df['low']) > 3 * (self._df['open'] - self._df['close']))
-                & ((self._df['high'] - self._df['close']) / (.001 + self._df['high'] - self._df['low']) > 0.6)
-                & ((self._df['high'] - self._df['open']) / (.001 + self._df['high'] - self._df['low']) > 0.6))
+                ((h - l) > 3 * (o - c))
+                & ((h - c) / size > 0.6)
+                & ((h - o) / size > 0.6))
 
     def _set_candle_morning_star(self):
         """
         Candlestick Detected: Morning Star ("Strong - Reversal - Bullish Pattern - Up")
         """
 
+        if self._is_computed('morning_star'):
+            return
+
+        o, c = self._get_arrays('open', 'close')
+        o2, c2 = self._get_shifted('open', 2), self._get_shifted('close', 2)
+        body1_high = np.maximum(self._get_shifted('open', 1), self._get_shifted('close', 1))
+
         self._df['morning_star'] = (
-                ((np.maximum(self.df['open'].shift(1), self.df['close'].shift(1)) < self.df['close'].shift(2))
-                 & (self.df['close'].shift(2) < self.df['open'].shift(2)))
-                & ((self.df['close'] > self.df['open'])
-                   & (self.df['open'] > np.maximum(self.df['open'].shift(1), self.df['close'].shift(1)))))
+                ((body1_high < c2) & (c2 < o2))
+                & ((c > o) & (o > body1_high)))
 
     def _set_candle_abandoned_baby(self):
         """
         Candlestick Detected: Abandoned Baby ("Reliable - Reversal - Bullish Pattern - Up")
         """
 
+        if self._is_computed('abandoned_baby'):
+            return
+
+        o, h, l, c = self._get_arrays('open', 'high', 'low', 'close')
+        h1 = self._get_shifted('high', 1)
+
         self._df['abandoned_baby'] = (
-                (self.df['open'] < self.df['close'])
-                & (self.df['high'].shift(1) < self.df['low'])
-                & (self.df['open'].shift(2) > self.df['close'].shift(2))
-                & (self.df['high'].shift(1) < self.df['low'].shift(2)))
+                (o < c)
+                & (h1 < l)
+                & (self._get_shifted('open', 2) > self._get_shifted('close', 2))
+                & (h1 < self._get_shifted('low', 2)))
 
     ##############################
     #           SIGNALS          #
     ##############################
 
     def _set_ema_signals(self):
-        if 'ema_12' not in self._df:
-            self._set_ema(12)
+        if self._is_computed('ema_signals'):
+            return
+
+        self._set_ema(12)
+        self._set_ema(26)
 
-        if 'ema_26' not in self._df:
-            self._set_ema(26)
+        ema_12 = self._df['ema_12'].to_numpy()
+        ema_26 = self._df['ema_26'].to_numpy()
 
         # true if EMA12 is above the EMA26
-        self._df['ema_golden_cross'] = self._df['ema_12'] > self._df['ema_26']
+        golden_cross = ema_12 > ema_26
+        # true if the EMA12 is below the EMA26
+        death_cross = ema_12 < ema_26
+
+        self._df['ema_golden_cross'] = golden_cross
         # true if the current frame is where EMA12 crosses over above
-        self._df['ema_golden_cross_co'] = self._df['ema_golden_cross'].ne(self._df['ema_golden_cross'].shift())
-        self._df.loc[self._df['ema_golden_cross'] == False, 'ema_golden_cross_co'] = False
+        self._df['ema_golden_cross_co'] = _rising_edges(golden_cross)
 
-        # true if the EMA12 is below the EMA26
-        self._df['ema_death_cross'] = self._df['ema_12'] < self._df['ema_26']
+        self._df['ema_death_cross'] = death_cross
         # true if the current frame is where EMA12 crosses over below
-        self._df['ema_death_cross_co'] = self._df['ema_death_cross'].ne(self._df['ema_death_cross'].shift())
-        self._df.loc[self._df['ema_death_cross'] == False, 'ema_death_cross_co'] = False
+        self._df['ema_death_cross_co'] = _rising_edges(death_cross)
 
     def _set_sma_signals(self):
-        if 'sma_50' not in self._df:
-            self._set_sma(50)
+        if self._is_computed('sma_signals'):
+            return
 
-        if 'sma_200' not in self._df:
-            self._set_sma(200)
+        self._set_sma(50)
+        self._set_sma(200)
 
-        self._df['sma_golden_cross'] = self._df['sma_50'] > self._df['sma_200']
-        self._df['sma_death_cross'] = self._df['sma_50'] < self._df['sma_200']
+        sma_50 = self._df['sma_50'].to_numpy()
+        sma_200 = self._df['sma_200'].to_numpy()
 
         # true if SMA50 is above the SMA200
-        self._df['sma_golden_cross'] = self._df['sma_50'] > self._df['sma_200']
+        golden_cross = sma_50 > sma_200
+        # true if the SMA50 is below the SMA200
+        death_cross = sma_50 < sma_200
+
+        self._df['sma_golden_cross'] = golden_cross
         # true if the current frame is where SMA50 crosses over above
-        self._df['sma_golden_cross_co'] = self._df['sma_golden_cross'].ne(self._df['sma_golden_cross'].shift())
-        self._df.loc[self._df['sma_golden_cross'] == False, 'sma_golden_cross_co'] = False
+        self._df['sma_golden_cross_co'] = _rising_edges(golden_cross)
 
-        # true if the SMA50 is below the SMA200
-        self._df['sma_death_cross'] = self._df['sma_50'] < self._df['sma_200']
+        self._df['sma_death_cross'] = death_cross
         # true if the current frame is where SMA50 crosses over below
-        self._df['sma_death_cross_co'] = self._df['sma_death_cross'].ne(self._df['sma_death_cross'].shift())
-        self._df.loc[self._df['sma_death_cross'] == False, 'sma_death_cross_co'] = False
+        self._df['sma_death_cross_co'] = _rising_edges(death_cross)
 
     def _set_macd_signals(self, fast_length: int = 12, slow_length: int = 26, signal_smoothing: int = 9):
+        if self._is_computed('macd_signals', fast_length, slow_length, signal_smoothing):
+            return
+
         self._set_macd(fast_length, slow_length, signal_smoothing)
 
+        macd = self._df['macd'].to_numpy()
+        macd_signal = self._df['macd_signal'].to_numpy()
+
         # true if MACD is above the Signal
-        self._df['macd_gt_signal'] = self._df['macd'] > self._df['macd_signal']
+        gt_signal = macd > macd_signal
+        # true if the MACD is below the Signal
+        lt_signal = macd < macd_signal
+
+        self._df['macd_gt_signal'] = gt_signal
         # true if the current frame is where MACD crosses over above
-        self._df['macd_gt_signal_co'] = self._df['macd_gt_signal'].ne(self._df.macd_gt_signal.shift())
-        self._df.loc[self._df['macd_gt_signal'] == False, 'macd_gt_signal_co'] = False
+        self._df['macd_gt_signal_co'] = _rising_edges(gt_signal)
 
-        # true if the MACD is below the Signal
-        self._df['macd_lt_signal'] = self._df['macd'] < self._df['macd_signal']
+        self._df['macd_lt_signal'] = lt_signal
         # true if the current frame is where MACD crosses over below
-        self._df['macd_lt_signal_co'] = self._df['macd_lt_signal'].ne(self._df.macd_lt_signal.shift())
-        self._df.loc[self._df['macd_lt_signal'] == False, 'macd_lt_signal_co'] = False
+        self._df['macd_lt_signal_co'] = _rising_edges(lt_signal)
 
     def _set_ichimoku_signals(self):
-        if 'tenkan_sen' not in self._df:
-            self._set_ichimoku()
+        if self._is_computed('ichimoku_signals'):
+            return
+
+        self._set_ichimoku()
+
+        df = self._df
+        close, = self._get_arrays('close')
+        tenkan_sen = df['tenkan_sen'].to_numpy()
+        kijun_sen = df['kijun_sen'].to_numpy()
+        senkou_span_a = df['senkou_span_a'].to_numpy()
+        senkou_span_b = df['senkou_span_b'].to_numpy()
 
-        self._df['ichimoku_golden_cross'] = self._df['tenkan_sen'] > self._df['kijun_sen']
-        self._df['ichimoku_death_cross'] = self._df['tenkan_sen'] < self._df['kijun_sen']
+        df['ichimoku_golden_cross'] = tenkan_sen > kijun_sen
+        df['ichimoku_death_cross'] = tenkan_sen < kijun_sen
 
         # Close price is below the cloud - Bullish signal
-        self._df['price_below_cloud'] = self._df['close'].lt(
-            np.minimum(self._df['senkou_span_a'], self._df['senkou_span_b']))
+        df['price_below_cloud'] = close < np.minimum(senkou_span_a, senkou_span_b)
 
         # Close price is above the cloud - Bearish signal
-        self._df['price_above_cloud'] = self._df['close'].gt(
-            np.maximum(self._df['senkou_span_a'], self._df['senkou_span_b']))
+        df['price_above_cloud'] = close > np.maximum(senkou_span_a, senkou_span_b)
 
     def _set_eri_signals(self):
         """
         Calculates Elder Ray Index (ERI) Signals
         """
-        if 'bull_power' not in self._df or 'bear_power' not in self._df:
-            self._set_eri()
+        if self._is_computed('eri_signals'):
+            return
+
+        self._set_eri()
+
+        df = self._df
+        bull_power = df['bull_power'].to_numpy()
+        bear_power = df['bear_power'].to_numpy()
+        prev_bull_power = _shift(bull_power, 1)
+        prev_bear_power = _shift(bear_power, 1)
 
         # bear power’s value is negative but increasing (i.e. becoming less bearish)
         # bull power’s value is increasing (i.e. becoming more bullish)
-        eri_buy = (((self._df['bear_power'] < 0) & (self._df['bear_power'] > self._df['bear_power'].shift(1))) |
-                   (self._df['bull_power'] > self._df['bull_power'].shift(1)))
+        eri_buy = ((bear_power < 0) & (bear_power > prev_bear_power)) | (bull_power > prev_bull_power)
 
         # bull power’s value is positive but decreasing (i.e. becoming less bullish)
         # bear power’s value is decreasing (i.e., becoming more bearish)
-        eri_sell = (((self._df['bull_power'] > 0) & (self._df['bull_power'] < self._df['bull_power'].shift(1))) |
-                    (self._df['bear_power'] < self._df['bear_power'].shift(1)))
+        eri_sell = ((bull_power > 0) & (bull_power < prev_bull_power)) | (bear_power < prev_bear_power)
 
-        self._df['eri_buy'] = eri_buy
-        self._df['eri_sell'] = eri_sell
+        df['eri_buy'] = eri_buy
+        df['eri_sell'] = eri_sell
 
     def _set_bollinger_bands_signals(self, length: int = 20, width: int = 2):
         """
         Buy/Sell Bollinger Bands signals
         """
-        if 'bb_u' not in self._df:
-            self._set_bollinger_bands(length, width)
+        if self._is_computed('bollinger_bands_signals', length, width):
+            return
 
-        self._df['bb_buy'] = self._df['close'] < self._df['bb_l']
-        self._df['bb_sell'] = self._df['close'] > self._df['bb_u']
+        self._set_bollinger_bands(length, width)
+
+        df = self._df
+        close, = self._get_arrays('close')
+
+        df['bb_buy'] = close < df['bb_l'].to_numpy()
+        df['bb_sell'] = close > df['bb_u'].to_numpy()
 
     def _set_pump_signal(self, period: int, sensitivity_factor: int):
-        if 'roc' not in self._df:
-            self._set_roc(period)
+        key = f'pump_level_{period}_{sensitivity_factor}'
+
+        if self._is_computed(key):
+            return
 
-        level_1 = 6 * sensitivity_factor
-        level_2 = 9 * sensitivity_factor
-        level_3 = 12 * sensitivity_factor
-        level_4 = 20 * sensitivity_factor
-        level_5 = 30 * sensitivity_factor
+        self._set_roc(period)
+        roc = self._df[f'roc_{period}'].to_numpy()
 
-        self._df['level_1_pump_signal'] = (self._df['roc'] >= level_1) & (self._df['roc'] < level_2)
-        self._df['level_2_pump_signal'] = (self._df['roc'] >= level_2) & (self._df['roc'] < level_3)
-        self._df['level_3_pump_signal'] = (self._df['roc'] >= level_3) & (self._df['roc'] < level_4)
-        self._df['level_4_pump_signal'] = (self._df['roc'] >= level_4) & (self._df['roc'] < level_5)
-        self._df['level_5_pump_signal'] = self._df['roc'] >= level_5
+        # Level 1-5 is the number of thresholds the growth reached
+        self._df[key] = self._get_signal_levels(roc, sensitivity_factor)
 
     def _set_dump_signal(self, period: int, sensitivity_factor: int):
-        if 'roc' not in self._df:
-            self._set_roc(period)
+        key = f'dump_level_{period}_{sensitivity_factor}'
 
-        level_1 = 6 * sensitivity_factor * -1
-        level_2 = 9 * sensitivity_factor * -1
-        level_3 = 12 * sensitivity_factor * -1
-        level_4 = 20 * sensitivity_factor * -1
-        level_5 = 30 * sensitivity_factor * -1
+        if self._is_computed(key):
+            return
 
-        self._df['level_1_dump_signal'] = (self._df['roc'] <= level_1) & (self._df['roc'] > level_2)
-        self._df['level_2_dump_signal'] = (self._df['roc'] <= level_2) & (self._df['roc'] > level_3)
-        self._df['level_3_dump_signal'] = (self._df['roc'] <= level_3) & (self._df['roc'] > level_4)
-        self._df['level_4_dump_signal'] = (self._df['roc'] <= level_4) & (self._df['roc'] > level_5)
-        self._df['level_5_dump_signal'] = self._df['roc'] <= level_5
+        self._set_roc(period)
+        roc = self._df[f'roc_{period}'].to_numpy()
+
+        # Level 1-5 is the number of thresholds the fall reached
+        self._df[key] = self._get_signal_levels(-roc, sensitivity_factor)
+
+    @staticmethod
+    def _get_signal_levels(roc: np.ndarray, sensitivity_factor: int) -> np.ndarray:
+        levels = np.digitize(roc, SIGNAL_THRESHOLDS * sensitivity_factor)
+
+        # digitize puts NaN past the last threshold
+        levels[np.isnan(roc)] = 0
+        return levels
 
     def _support_resistance_levels(self, show=False) -> List:
         """
         Support and Resistance levels.
         """
+        low = self._df['low'].to_numpy()
+        high = self._df['high'].to_numpy()
+
+        # Fractal pivots: the candle is lower (higher) than two neighbours on each side
+        support = (
+            (low[2:-2] < low[1:-3]) & (low[2:-2] < low[3:-1]) &
+            (low[3:-1] < low[4:]) & (low[1:-3] < low[:-4])
+        )
+        resistance = (
+            (high[2:-2] > high[1:-3]) & (high[2:-2] > high[3:-1]) &
+            (high[3:-1] > high[4:]) & (high[1:-3] > high[:-4])
+        )
+
+        pivots = np.flatnonzero(support | resistance) + 2
+        values = np.where(support[pivots - 2], low[pivots], high[pivots])
         levels = []
 
-        for i in range(2, self._df.shape[0] - 2):
-            if self._is_support(i):
-                l = self._df['low'][i]
-                if self._is_far_from_level(l, levels):
-                    levels.append((i, l))
-            elif self._is_resistance(i):
-                l = self._df['high'][i]
-                if self._is_far_from_level(l, levels):
+        if pivots.size:
+            # Levels closer than the mean candle size to an already found one are skipped
+            s = np.mean(high - low)
+            accepted = []
+
+            for i, l in zip(pivots.tolist(), values.tolist()):
+                if all(abs(l - x) >= s for x in accepted):
+                    accepted.append(l)
                     levels.append((i, l))
 
         if show:
@@ -638,26 +876,6 @@ class TechnicalAnalysis:
 
         return levels
 
-    def _is_support(self, i: float):
-        c1 = self._df['low'][i] < self._df['low'][i - 1]
-        c2 = self._df['low'][i] < self._df['low'][i + 1]
-        c3 = self._df['low'][i + 1] < self._df['low'][i + 2]
-        c4 = self._df['low'][i - 1] < self._df['low'][i - 2]
-        support = c1 and c2 and c3 and c4
-        return support
-
-    def _is_resistance(self, i: float):
-        c1 = self._df['high'][i] > self._df['high'][i - 1]
-        c2 = self._df['high'][i] > self._df['high'][i + 1]
-        c3 = self._df['high'][i + 1] > self._df['high'][i + 2]
-        c4 = self._df['high'][i - 1] > self._df['high'][i - 2]
-        resistance = c1 and c2 and c3 and c4
-        return resistance
-
-    def _is_far_from_level(self, l: float, levels):
-        s = np.mean(self._df['high'] - self._df['low'])
-        return np.sum([abs(l - x) < s for x in levels]) == 0
-
     def _show(self, levels: List[Tuple]):
         plt.subplot(111)
         plt.plot(self._df['close'])
@@ -667,14 +885,52 @@ class TechnicalAnalysis:
         for level in levels:
             plt.hlines(
                 y=level[1],
-                xmin=self._df['timestamp'][level[0]],
+                xmin=self._df['timestamp'].iloc[level[0]],
                 xmax=max(self._df['timestamp']),
                 colors='blue'
             )
 
         plt.show()
 
+    def _is_computed(self, name: str, *params) -> bool:
+        """
+        Whether the indicator is already calculated with these parameters.
+        If not, it is marked as calculated, the caller is expected to calculate it.
+        Columns are only written by the setters after this check, so the values read by _get are dropped here.
+        """
+        if self._computed.get(name) == params:
+            return True
+
+        self._computed[name] = params
+        self._values.clear()
+        return False
+
+    def _get_arrays(self, *names: str) -> Tuple[np.ndarray, ...]:
+        arrays = self._arrays
+
+        for name in names:
+            if name not in arrays:
+                arrays[name] = self._df[name].to_numpy(dtype=np.float64)
+
+        return tuple(arrays[name] for name in names)
+
+    def _get_shifted(self, name: str, periods: int) -> np.ndarray:
+        # Shifted candle columns are shared by the candlestick patterns
+        key = f'{name}_{periods}'
+        shifted = self._arrays.get(key)
+
+        if shifted is None:
+            shifted = self._arrays[key] = _shift(*self._get_arrays(name), periods)
+
+        return shifted
+
     def _get(self, name, index):
-        if len(self._df) >= abs(index):
-            res = self._df[name].iloc[index]
-            return None if pandas.isnull(res) else res
+        values = self._values.get(name)
+
+        if values is None:
+            values = self._values[name] = self._df[name].to_numpy()
+
+        if len(values) >= abs(index):
+            res = values[index]
+            # NaN is the only value not equal to itself
+            return None if res != res else res
@@ -1,38 +1,56 @@
 import asyncio
-import copy
 import inspect
 import logging
+from collections import deque
 from decimal import Decimal
-from queue import Queue
-from typing import Dict, List, Callable, Set, Iterable
+from typing import List, Callable, Set, Iterable, Tuple
+
+import numpy as np
 
 from modules.models import DepthModel, DepthUpdateModel
 
+# Side of the book: (prices, quantities), sorted by price ascending
+Book = Tuple[np.ndarray, np.ndarray]
+
+EMPTY_BOOK: Book = (np.empty(0), np.empty(0))
+
 
 class Depth:
     def __init__(self, limit: int):
         self._limit = limit
 
-        self._bids: Dict[str, Decimal] = {}
-        self._asks: Dict[str, Decimal] = {}
+        self._bids: Book = EMPTY_BOOK
+        self._asks: Book = EMPTY_BOOK
 
         self._last_update_id = 0
         self._is_snapshot_set = False
         self._is_first_update_processed = False
         self._gap_callbacks: Set[Callable] = set()
 
-        self._queue = Queue()
+        # Updates received before the snapshot, only touched from the event loop
+        self._queue = deque()
         self._loop = asyncio.get_event_loop()
 
+    @property
+    def bids(self) -> List[List[Decimal]]:
+        """
+        Bid levels, best (highest) price first.
+        """
+        return self._to_decimal(self._bids)[::-1]
+
+    @property
+    def asks(self) -> List[List[Decimal]]:
+        """
+        Ask levels, best (lowest) price first.
+        """
+        return self._to_decimal(self._asks)
+
     def add_gap_callback(self, cb: Callable):
         self._gap_callbacks.add(cb)
 
     def set_snapshot(self, model: DepthModel):
-        self._bids.clear()
-        self._asks.clear()
-
-        self._update(model.bids, self._bids)
-        self._update(model.asks, self._asks)
+        self._bids = self._update(model.bids, EMPTY_BOOK, keep_highest=True)
+        self._asks = self._update(model.asks, EMPTY_BOOK, keep_highest=False)
 
         self._last_update_id = model.last_update_id
         self._is_snapshot_set = True
@@ -40,19 +58,19 @@ class Depth:
         logging.info('Depth: snapshot set')
 
         # Apply deferred updates
-        while not self._queue.empty():
-            item = self._queue.get()
+        while self._queue:
+            item = self._queue.popleft()
             self.update(item)
 
     def update(self, model: DepthUpdateModel):
         if not self._is_snapshot_set:
-            self._queue.put(model)
+            self._queue.append(model)
 
         else:
             if self._is_first_update_processed:
                 if model.first_update_id == self._last_update_id + 1:
-                    self._update(model.bids, self._bids)
-                    self._update(model.asks, self._asks)
+                    self._bids = self._update(model.bids, self._bids, keep_highest=True)
+                    self._asks = self._update(model.asks, self._asks, keep_highest=False)
                     self._last_update_id = model.last_update_id
 
                 else:
@@ -61,8 +79,8 @@ class Depth:
                     self._last_update_id = 0
                     self._is_snapshot_set = False
                     self._is_first_update_processed = False
-                    self._asks.clear()
-                    self._asks.clear()
+                    self._bids = EMPTY_BOOK
+                    self._asks = EMPTY_BOOK
 
                     self._trigger_callbacks(self._gap_callbacks)
 
@@ -72,25 +90,57 @@ class Depth:
                     return
 
                 if self._last_update_id == 0 or model.first_update_id <= self._last_update_id + 1 <= model.last_update_id:
-                    self._update(model.bids, self._bids)
-                    self._update(model.asks, self._asks)
+                    self._bids = self._update(model.bids, self._bids, keep_highest=True)
+                    self._asks = self._update(model.asks, self._asks, keep_highest=False)
                     self._last_update_id = model.last_update_id
                     self._is_first_update_processed = True
 
-    def _update(self, items: List[List[Decimal]], container: Dict[str, Decimal]):
-        for [price, quantity] in items:
-            if quantity == 0:
-                container.pop(price, None)
+    def _update(self, items: List[List[Decimal]], book: Book, keep_highest: bool) -> Book:
+        """
+        Merge price levels into one side of the book and keep the best `limit` levels.
+        A zero quantity removes the level.
+        """
+        if not items:
+            return book
 
-            else:
-                is_sort_required = price not in container
-                container[price] = quantity
-
-                if is_sort_required:
-                    sorted_keys = sorted(container, key=container.get)[:self._limit]
-                    container_cp = copy.copy(container)
-                    container.clear()
-                    container.update({k: container_cp[k] for k in sorted_keys})
+        prices, quantities = book
+        levels = np.array(items, dtype=np.float64)
+        levels = levels[np.argsort(levels[:, 0], kind='stable')]
+        new_prices, new_quantities = levels[:, 0], levels[:, 1]
+
+        # Existing levels are updated in place, the rest are inserted keeping the order
+        idx = np.searchsorted(prices, new_prices)
+        found = idx < prices.size
+        found[found] = prices[idx[found]] == new_prices[found]
+
+        quantities = quantities.copy()
+        quantities[idx[found]] = new_quantities[found]
+
+        # Most updates only change quantities of known levels, skip the reallocations then
+        missing = ~found
+
+        if missing.any():
+            prices = np.insert(prices, idx[missing], new_prices[missing])
+            quantities = np.insert(quantities, idx[missing], new_quantities[missing])
+
+        live = quantities != 0
+
+        if not live.all():
+            prices, quantities = prices[live], quantities[live]
+
+        if prices.size > self._limit:
+            cut = slice(-self._limit, None) if keep_highest else slice(None, self._limit)
+            prices, quantities = prices[cut], quantities[cut]
+
+        return prices, quantities
+
+    @staticmethod
+    def _to_decimal(book: Book) -> List[List[Decimal]]:
+        prices, quantities = book
+        return [
+            [Decimal(repr(price)), Decimal(repr(quantity))]
+            for price, quantity in zip(prices.tolist(), quantities.tolist())
+        ]
 
     def _trigger_callbacks(self, callbacks: Iterable[Callable], *args, **kwargs):
         for callback in callbacks:
@@ -1,15 +1,15 @@
 import asyncio
-import itertools
 import logging
-from time import time
-from typing import Dict, List, Tuple
+from time import time_ns, monotonic
+from typing import Dict, List, Tuple, Optional
 
-from modules.mongo import MongoClient
+from modules.mongo import BatchedMongoClient
 from modules.exchanges import BinanceClient, BinanceUserClient, BinanceUserStreamClient
+from modules.exchanges.base import BaseExchangeClient, BaseExchangeUserClient
 from modules.line_client import LineClient
 
 from modules.models import TradeUpdateModel, BookUpdateModel
-from modules.models.types import StreamEntity, Symbol, TickType, Timestamp
+from modules.models.types import StreamEntity, Symbol, Timestamp
 from modules.models.strategy import StrategyRules
 from modules.models.indexes import INDEXES
 
@@ -17,23 +17,58 @@ from services.bot.state import ExchangeState
 from services.bot.settings import Settings
 from services.bot.strategies import Strategy
 
+# Strategies executing their commands at once
+EXECUTE_CONCURRENCY = 10
+# Command executions per second, bursts up to EXECUTE_CONCURRENCY
+EXECUTE_RATE = 20
+
+
+class RateLimiter:
+    """
+    Token bucket: allows bursts of `capacity` calls, refilled at `rate` calls per second.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = monotonic()
+
+    async def acquire(self):
+        while True:
+            now = monotonic()
+            self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+            self._updated = now
+
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+
+            await asyncio.sleep((1 - self._tokens) / self._rate)
+
 
 class StrategiesOrchestrator:
+    """
+    Runs the strategies against the live line and exchange.
+    Subclasses override the _create_*, _add_line_callbacks and _get_user_clients methods
+    to run them elsewhere, e.g. on a replay.
+    """
+
+    __slots__ = (
+        'settings', 'db', 'line', 'exchange', 'state', 'user_clients',
+        '_exchange_name', '_strategies', '_loop', '_event', '_execute_semaphore', '_execute_limiter',
+    )
+
     def __init__(self, settings: Settings):
         self.settings = settings
 
-        self.db = MongoClient(
+        self.db = BatchedMongoClient(
             mongo_uri=settings.mongo_uri,
             indexes=INDEXES,
         )
-        self.line = LineClient(
-            symbols=settings.symbols,
-            uri=settings.broker_amqp_uri,
-            entities=[StreamEntity.BOOK, StreamEntity.TRADE],
-        )
-        self.exchange = BinanceClient(
-            testnet=settings.binance_testnet,
-        )
+        self.line = self._create_line()
+        self.exchange = self._create_exchange()
+        self._exchange_name = type(self.exchange).__name__
         self.state = ExchangeState(
             exchange=self.exchange,
             symbols=self.settings.symbols,
@@ -42,9 +77,11 @@ class StrategiesOrchestrator:
 
         self.user_clients: Dict[Tuple[str, str], Tuple[BinanceUserClient, BinanceUserStreamClient]] = {}
 
-        self._strategies: Dict[Symbol: List[Strategy]] = []
+        self._strategies: Dict[Symbol, List[Strategy]] = {}
         self._loop = asyncio.get_event_loop()
         self._event = asyncio.Event()
+        self._execute_semaphore = asyncio.Semaphore(EXECUTE_CONCURRENCY)
+        self._execute_limiter = RateLimiter(EXECUTE_RATE, EXECUTE_CONCURRENCY)
 
         # if settings.depth_limit:
         #     self.depth = Depth(
@@ -52,12 +89,13 @@ class StrategiesOrchestrator:
         #     )
         #     self.depth.add_gap_callback(self._set_depth_snapshot)
 
-        self.line.add_reset_callback(self._on_line_reset)
-        self.line.add_update_callback(StreamEntity.BOOK, self._on_book_update)
-        self.line.add_update_callback(StreamEntity.TRADE, self._on_trade_update)
-        # self.line.add_update_callback(StreamEntity.DEPTH, self._on_depth_update)
+        self._add_line_callbacks()
 
     async def start(self):
+        # Tasks that finish without suspending skip the event loop round-trip (Python 3.12+)
+        if hasattr(asyncio, 'eager_task_factory'):
+            asyncio.get_running_loop().set_task_factory(asyncio.eager_task_factory)
+
         await self.db.connect()
         await self.state.preload()
         await self.line.connect()
@@ -65,14 +103,44 @@ class StrategiesOrchestrator:
 
     async def stop(self):
         await self.line.disconnect()
+        # Flushes the queued writes, so the loop is stopped only after it
+        await self.db.disconnect()
+        self._loop.stop()
 
     async def run_strategy(self, rules: StrategyRules):
-        key = (rules.binance_public_key, rules.binance_private_key)
+        client, stream = self._get_user_clients(rules)
+        strategy = Strategy(rules, self.db, self.state, client, stream)
 
-        if key in self.user_clients:
-            client, stream = self.user_clients[key]
+        if not self._event.is_set():
+            await self._event.wait()
+
+        await strategy.start()
 
-        else:
+        for symbol in rules.symbols:
+            self._strategies.setdefault(symbol, []).append(strategy)
+
+    def _create_line(self):
+        return LineClient(
+            symbols=self.settings.symbols,
+            uri=self.settings.broker_amqp_uri,
+            entities=[StreamEntity.BOOK, StreamEntity.TRADE],
+        )
+
+    def _create_exchange(self) -> BaseExchangeClient:
+        return BinanceClient(
+            testnet=self.settings.binance_testnet,
+        )
+
+    def _add_line_callbacks(self):
+        self.line.add_reset_callback(self._on_line_reset)
+        self.line.add_batch_update_callback(StreamEntity.BOOK, self._on_book_batch)
+        self.line.add_batch_update_callback(StreamEntity.TRADE, self._on_trade_batch)
+        # self.line.add_update_callback(StreamEntity.DEPTH, self._on_depth_update)
+
+    def _get_user_clients(self, rules: StrategyRules) -> Tuple[BaseExchangeUserClient, BinanceUserStreamClient]:
+        key = (rules.binance_public_key, rules.binance_private_key)
+
+        if key not in self.user_clients:
             client = BinanceUserClient(
                 public_key=rules.binance_public_key,
                 private_key=rules.binance_private_key,
@@ -84,57 +152,60 @@ class StrategiesOrchestrator:
             )
             self.user_clients[key] = (client, stream)
 
-        strategy = Strategy(rules, self.db, self.state, client, stream)
-        await self._event.wait()
-        await strategy.start()
-        self._strategies.append(strategy)
+        return self.user_clients[key]
 
     async def _on_line_reset(self):
         await self.state.preload()
 
+    async def _on_book_batch(self, symbol: Symbol, models: List[BookUpdateModel]):
+        # Only the latest book matters
+        await self._on_book_update(symbol, models[-1])
+
     async def _on_book_update(self, symbol: Symbol, model: BookUpdateModel):
         self.state.update_book(symbol, model)
-        has_commands: List[Strategy] = []
 
-        for strategy in self._strategies:
+        # Usually no strategy has outgoing commands, the list is only allocated when one does
+        has_commands: Optional[List[Strategy]] = None
+
+        for strategy in self._strategies.get(symbol, ()):
             if strategy.command_handler.has_outgoing_commands(symbol):
+                if has_commands is None:
+                    has_commands = []
                 has_commands.append(strategy)
             else:
                 await strategy.on_book_update(symbol)
 
-        await self._execute(symbol, has_commands)
+        if has_commands:
+            await self._execute(symbol, has_commands)
 
-    async def _on_trade_update(self, symbol: Symbol, model: TradeUpdateModel):
-        tick_types = self.state.update_candles(symbol, model)
-        skip = self._check_delay(model.timestamp)
+    async def _on_trade_batch(self, symbol: Symbol, models: List[TradeUpdateModel]):
+        new_candle = self.state.update_candles_bulk(symbol, models)
+        skip = self._check_delay(models[-1].timestamp)
 
         if skip:
             return
 
-        if any([tick_type is TickType.NEW_CANDLE for tick_type in tick_types.values()]):
-            has_commands = []
+        if new_candle:
+            has_commands: Optional[List[Strategy]] = None
 
-            for strategy in self._strategies:
+            for strategy in self._strategies.get(symbol, ()):
                 if strategy.command_handler.has_outgoing_commands(symbol):
+                    if has_commands is None:
+                        has_commands = []
                     has_commands.append(strategy)
                 else:
                     await strategy.on_candles_update(symbol)
 
-            await self._execute(symbol, has_commands)
+            if has_commands:
+                await self._execute(symbol, has_commands)
 
     async def _execute(self, symbol: Symbol, strategies: List[Strategy]):
-        for strategies in self.chunked(strategies, 10):
-            await asyncio.gather(*[s.command_handler.execute(symbol) for s in strategies])
-            await asyncio.sleep(0.5)
+        await asyncio.gather(*[self._execute_strategy(symbol, s) for s in strategies])
 
-    @staticmethod
-    def chunked(iterable, n):
-        it = iter(iterable)
-        while True:
-            chunk = tuple(itertools.islice(it, n))
-            if not chunk:
-                return
-            yield chunk
+    async def _execute_strategy(self, symbol: Symbol, strategy: Strategy):
+        async with self._execute_semaphore:
+            await self._execute_limiter.acquire()
+            await strategy.command_handler.execute(symbol)
 
     # def _on_depth_update(self, model: DepthUpdateModel):
     #     if not self._ready:
@@ -144,11 +215,10 @@ class StrategiesOrchestrator:
 
     def _check_delay(self, timestamp: Timestamp) -> bool:
         skip = False
-        diff = time() * 1000 - timestamp
-        exchange_name = self.exchange.__class__.__name__
+        diff = time_ns() // 1_000_000 - timestamp
 
         if diff >= 5000:
-            logging.warning(f'{exchange_name}: Messages processing delay of {diff / 1000:.2f}s!')
+            logging.warning(f'{self._exchange_name}: Messages processing delay of {diff / 1000:.2f}s!')
             skip = True
 
         return skip
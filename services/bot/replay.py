@@ -1,88 +1,65 @@
 import asyncio
 from decimal import Decimal
-from typing import Dict, List
+
+import uvloop
 
 from logger import setup_logging
 from modules.exchanges.fake import FakeExchangeClient
 from modules.exchanges.fake.client import FakeExchangeUserClient
-from modules.mongo import MongoClient
 from modules.line_client import ReplayClient
 
 from modules.models import TradeUpdateModel, BookUpdateModel
-from modules.models.types import StreamEntity, Symbol, TickType, PositionSide, OrderSide
+from modules.models.types import StreamEntity, Symbol, PositionSide, OrderSide
 from modules.models.strategy import StrategyRules
-from modules.models.indexes import INDEXES
 
-from services.bot.state import ExchangeState
+from services.bot.orchestrator import StrategiesOrchestrator
 from services.bot.settings import Settings
-from services.bot.strategies import Strategy
 
 
-class StrategiesOrchestrator:
-    def __init__(self, settings: Settings):
-        self.settings = settings
+class ReplayOrchestrator(StrategiesOrchestrator):
+    """
+    Replays the logged line updates against the fake exchange.
+    Updates are handled one by one without rate limits, so a replay is deterministic.
+    """
 
-        self.db = MongoClient(
-            mongo_uri=settings.mongo_uri,
-            indexes=INDEXES,
-        )
-        self.line = ReplayClient(
-            db=self.db,
-            symbols=settings.symbols,
-            replay_speed=settings.replay_speed,
-            replay_from=settings.replay_from,
-            replay_to=settings.replay_to,
-        )
-        self.line.add_done_callback(self._replay_summary)
-        self.exchange = FakeExchangeClient()
+    __slots__ = ()
 
-        self.state = ExchangeState(
-            exchange=self.exchange,
+    def _create_line(self):
+        line = ReplayClient(
+            db=self.db,
             symbols=self.settings.symbols,
-            candles_limit=self.settings.candles_limit
+            replay_speed=self.settings.replay_speed,
+            replay_from=self.settings.replay_from,
+            replay_to=self.settings.replay_to,
         )
+        line.add_done_callback(self._replay_summary)
+        return line
 
-        self._strategies: Dict[Symbol: List[Strategy]] = []
-        self._loop = asyncio.get_event_loop()
-        self._event = asyncio.Event()
+    def _create_exchange(self):
+        return FakeExchangeClient()
 
+    def _add_line_callbacks(self):
         self.line.add_update_callback(StreamEntity.BOOK, self._on_book_update)
         self.line.add_update_callback(StreamEntity.TRADE, self._on_trade_update)
 
-    async def start(self):
-        await self.db.connect()
-        await self.state.preload()
-        await self.line.connect()
-        self._event.set()
-
-    async def stop(self):
-        await self.line.disconnect()
-
-    async def run_strategy(self, rules: StrategyRules):
+    def _get_user_clients(self, rules: StrategyRules):
         exchange = FakeExchangeUserClient(self.state)
-        stream = exchange.user_stream
-        strategy = Strategy(rules, self.db, self.state, exchange, stream)
-        self._strategies.append(strategy)
-
-        if not self._event.is_set():
-            await self._event.wait()
-
-        await strategy.start()
+        return exchange, exchange.user_stream
 
     async def _on_book_update(self, symbol: Symbol, model: BookUpdateModel):
         self.state.update_book(symbol, model)
 
-        for strategy in self._strategies:
+        for strategy in self._strategies.get(symbol, ()):
             await strategy.on_book_update(symbol)
 
             if strategy.command_handler.has_outgoing_commands(symbol):
                 await strategy.command_handler.execute(symbol)
 
     async def _on_trade_update(self, symbol: Symbol, model: TradeUpdateModel):
-        tick_types = self.state.update_candles(symbol, model)
+        new_candle, _ = self.state.update_candles(symbol, model)
 
-        if any([tick_type is TickType.NEW_CANDLE for tick_type in tick_types.values()]):
-            for strategy in self._strategies:
+        if new_candle:
+            for strategy in self._strategies.get(symbol, ()):
                 await strategy.on_candles_update(symbol)
 
                 if strategy.command_handler.has_outgoing_commands(symbol):
@@ -93,7 +70,7 @@ class StrategiesOrchestrator:
         await self.stop()
 
 
-async def main(orchestrator: StrategiesOrchestrator):
+async def main(orchestrator: ReplayOrchestrator):
     await orchestrator.start()
 
     data = {
@@ -150,14 +127,15 @@ async def main(orchestrator: StrategiesOrchestrator):
         }
     }
 
-    strategy = StrategyRules.parse_obj(data)
+    strategy = StrategyRules.from_trusted(data)
     await orchestrator.run_strategy(strategy)
 
 
 if __name__ == '__main__':
+    uvloop.install()
     setup_logging()
     loop = asyncio.get_event_loop()
     settings = Settings()
-    orchestrator = StrategiesOrchestrator(settings)
+    orchestrator = ReplayOrchestrator(settings)
     loop.create_task(main(orchestrator))
     loop.run_forever()
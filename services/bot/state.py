@@ -1,7 +1,7 @@
 import asyncio
 import itertools
 import logging
-from typing import Dict, List
+from typing import Dict, List, Tuple
 
 from modules.exchanges.base import BaseExchangeClient
 from modules.models import TradeUpdateModel, ContractModel, BookUpdateModel
@@ -10,8 +10,13 @@ from modules.models.types import Timeframe, Symbol, TickType
 from services.bot import Candles
 # from services.bot.depth import Depth
 
+# Historical candles requests in flight at once, keeps the startup within the exchange request weight limits
+PRELOAD_CONCURRENCY = 20
+
 
 class ExchangeState:
+    __slots__ = ('exchange', 'candles_limit', 'contracts', 'book', 'candles', '_candles_seq')
+
     TIMEFRAMES = ['1m', '5m', '15m', '30m', '1h', '4h', '6h', '1d']
 
     def __init__(self, exchange: BaseExchangeClient, symbols: List[Symbol], candles_limit: int):
@@ -26,6 +31,11 @@ class ExchangeState:
         for symbol, timeframe in itertools.product(symbols, self.TIMEFRAMES):
             self.candles.setdefault(symbol, {})[timeframe] = Candles(timeframe, candles_limit)
 
+        # Candles of each symbol in TIMEFRAMES order, updated on every trade
+        self._candles_seq: Dict[Symbol, Tuple[Candles, ...]] = {
+            symbol: tuple(timeframes.values()) for symbol, timeframes in self.candles.items()
+        }
+
     async def preload(self):
         self.contracts = await self.exchange.get_contracts()
         self.book = await self.exchange.get_book()
@@ -34,14 +44,28 @@ class ExchangeState:
         # if self.settings.depth_limit:
         #     await self._preload_depth()
 
-    def update_candles(self, symbol: Symbol, model: TradeUpdateModel) -> Dict[Timeframe, TickType]:
-        output = {}
+    def update_candles(self, symbol: Symbol, model: TradeUpdateModel) -> Tuple[bool, Tuple[TickType, ...]]:
+        """
+        Returns whether any timeframe got a new candle, and the tick types in TIMEFRAMES order.
+        """
+        tick_types = tuple([candles.update(model) for candles in self._candles_seq[symbol]])
+        return TickType.NEW_CANDLE in tick_types, tick_types
 
-        for timeframe, candles in self.candles[symbol].items():
-            tick_type = candles.update(model)
-            output[timeframe] = tick_type
+    def update_candles_bulk(self, symbol: Symbol, models: List[TradeUpdateModel]) -> bool:
+        """
+        Applies the trades in order, returns whether any timeframe got a new candle.
+        """
+        new_candle = False
+        new_candle_tick = TickType.NEW_CANDLE
 
-        return output
+        for candles in self._candles_seq[symbol]:
+            update = candles.update
+
+            for model in models:
+                if update(model) is new_candle_tick:
+                    new_candle = True
+
+        return new_candle
 
     def get_candles(self, symbol: Symbol, timeframe: Timeframe) -> Candles:
         return self.candles[symbol][timeframe]
@@ -56,22 +80,23 @@ class ExchangeState:
         return self.contracts[symbol]
 
     async def _preload_candles(self):
-        for symbol, timeframes in self.candles.items():
-            tasks = []
+        semaphore = asyncio.Semaphore(PRELOAD_CONCURRENCY)
 
-            for timeframe in timeframes:
-                task = self.exchange.get_historical_candles(
+        async def get_snapshot(symbol: Symbol, timeframe: Timeframe):
+            async with semaphore:
+                return await self.exchange.get_historical_candles(
                     symbol=symbol,
                     timeframe=timeframe,
                     limit=self.candles_limit,
                 )
-                tasks.append(task)
 
-            logging.info(f'Preloading candlesticks for {symbol}...')
-            result = await asyncio.gather(*tasks)
+        pairs = [(symbol, timeframe) for symbol, timeframes in self.candles.items() for timeframe in timeframes]
+
+        logging.info(f'Preloading candlesticks for {", ".join(self.candles)}...')
+        result = await asyncio.gather(*[get_snapshot(symbol, timeframe) for symbol, timeframe in pairs])
 
-            for snapshot, timeframe in list(zip(result, timeframes)):
-                timeframes[timeframe].set_snapshot(snapshot)
+        for snapshot, (symbol, timeframe) in zip(result, pairs):
+            self.candles[symbol][timeframe].set_snapshot(snapshot)
 
     # async def _preload_depth(self):
     #     for symbol, timeframes in self.candles.items():
@@ -2,12 +2,12 @@ import asyncio
 import logging
 from uuid import uuid4
 from decimal import Decimal
-from time import time
-from typing import Optional, Callable, Dict, Set, List
+from time import time_ns
+from typing import Optional, Callable, Dict, Set, List, Type, Awaitable
 
-from orderedset import OrderedSet
+from pymongo.errors import DuplicateKeyError
 
-from modules.mongo import MongoClient
+from modules.mongo import BatchedMongoClient
 from modules.models import PositionModel, OrderModel
 from modules.exchanges.base import BaseExchangeUserClient
 from modules.models.commands import Command, TrailingStop, PlaceOrder
@@ -16,14 +16,21 @@ from modules.models.types import (
 )
 
 from services.bot.state import ExchangeState
-from services.bot.strategies.decorators import method_dispatch
 from services.bot.strategies.storage import LocalStorage
 
+# Commands handled in a row for one outgoing command, a longer chain is a misconfiguration
+MAX_COMMAND_CHAIN = 32
+
 
 class CommandHandler:
+    __slots__ = (
+        'db', 'exchange', 'storage', 'strategy_id', 'symbols', 'state',
+        '_commands', '_waiting', '_callbacks', '_loop', '_handlers',
+    )
+
     def __init__(
             self,
-            db: MongoClient,
+            db: BatchedMongoClient,
             exchange: BaseExchangeUserClient,
             storage: LocalStorage,
             strategy_id: StrategyId,
@@ -37,43 +44,70 @@ class CommandHandler:
         self.symbols = symbols
         self.state = state
 
-        self._commands: Dict[Symbol, OrderedSet[Command]] = {}
+        # Only symbols with outgoing commands are kept, commands are dict keys to keep their order
+        self._commands: Dict[Symbol, Dict[Command, None]] = {}
         self._waiting: Dict[ClientOrderId, PlaceOrder] = {}
         self._callbacks: Dict[str, Set[Callable]] = {}
         self._loop = asyncio.get_event_loop()
 
+        # Command handlers by the exact command type
+        self._handlers: Dict[Type[Command], Callable[[Command], Awaitable[Optional[Command]]]] = {
+            TrailingStop: self.handle_trailing_stop,
+            PlaceOrder: self.handle_place_order,
+        }
+
     def has_outgoing_commands(self, symbol: Symbol) -> bool:
-        return bool(self._commands.get(symbol, set()))
+        return symbol in self._commands
 
     def append(self, symbol: Symbol, command: Command):
-        if command not in self._commands:
-            self._commands.setdefault(symbol, OrderedSet()).add(command)
+        commands = self._commands.setdefault(symbol, {})
+
+        if command not in commands:
+            commands[command] = None
         else:
             logging.warning('Duplicate command ignored!')
 
     async def execute(self, symbol: Symbol):
-        commands = self._commands.get(symbol, set())
+        commands = self._commands.get(symbol)
 
         if not commands:
             return
 
-        next_commands = OrderedSet()
+        # Allocated only when a command is deferred to the next tick
+        next_commands: Optional[Dict[Command, None]] = None
 
         for command in commands:
-            while command:
+            for _ in range(MAX_COMMAND_CHAIN):
                 command = await self.handle(command)
 
-                if command and command.next_time:
-                    next_commands.add(command)
+                if not command:
                     break
 
-        self._commands[symbol] = next_commands
+                if command.next_time:
+                    if next_commands is None:
+                        next_commands = {}
+                    next_commands[command] = None
+                    break
+
+                # Let other tasks run between the chained commands
+                await asyncio.sleep(0)
 
-    @method_dispatch  # pragma: no cover
-    async def handle(self, command: Command, **kwargs) -> Optional[Command]:
-        raise RuntimeError('Inconsistent command!')
+            else:
+                logging.error(f'Command chain is longer than {MAX_COMMAND_CHAIN} commands, dropped: {command}')
+
+        if next_commands:
+            self._commands[symbol] = next_commands
+        else:
+            self._commands.pop(symbol, None)
+
+    async def handle(self, command: Command) -> Optional[Command]:
+        handler = self._handlers.get(type(command))
+
+        if not handler:
+            raise RuntimeError('Inconsistent command!')
+
+        return await handler(command)
 
-    @handle.register(TrailingStop)
     async def handle_trailing_stop(self, command: TrailingStop) -> Command:
         book = self.state.get_book(command.symbol)
         triggered = book and command.update(book)
@@ -86,7 +120,6 @@ class CommandHandler:
 
         return next_command
 
-    @handle.register(PlaceOrder)
     async def handle_place_order(self, command: PlaceOrder):
         client_order_id = ClientOrderId(uuid4().hex)
         self._waiting[client_order_id] = command
@@ -118,19 +151,7 @@ class CommandHandler:
         if order.client_order_id not in self._waiting:
             return
 
-        count = await self.db.count(OrderModel, query={'id': order.id})
-
-        if not count:
-            command = self._waiting[order.client_order_id]
-            order.context = command.context if command and command.context else None
-            await self.db.create(order)
-
-        else:
-            order = await self.db.partial_update(
-                model=OrderModel,
-                update_fields=order.dict(exclude_none=True),
-                query={'id': order.id}
-            )
+        position = None
 
         if order.is_filled:
             position = self.storage.get_position(order.symbol, order.position_side)
@@ -138,11 +159,25 @@ class CommandHandler:
             if not position:
                 position = await self._create_position(order.symbol, order.position_side)
 
+            # Stored along with the order rather than by a separate update
+            order.position_id = position.id
+
+        update_fields = order.dict(exclude_none=True)
+
+        # Known orders are rejected by the unique id index, no need to look them up first
+        try:
+            command = self._waiting[order.client_order_id]
+            order.context = command.context if command and command.context else None
+            await self.db.create(order)
+
+        except DuplicateKeyError:
             order = await self.db.partial_update(
                 model=OrderModel,
-                update_fields={'position_id': position.id},
+                update_fields=update_fields,
                 query={'id': order.id}
             )
+
+        if position:
             self.storage.add_order(order)
 
             logging.info(f'Order filled! '
@@ -173,7 +208,7 @@ class CommandHandler:
             entry_price=Decimal('0'),
             exit_price=Decimal('0'),
             orders=[],
-            create_timestamp=int(time() * 1000),
+            create_timestamp=time_ns() // 1_000_000,
         )
         await self.db.create(position)
         self.storage.add_position(position)
@@ -185,24 +220,22 @@ class CommandHandler:
 
     async def _update_position(self, position: PositionModel, order: OrderModel):
         entry_side = position.get_entry_order_side()
-        exit_side = position.get_exit_order_side()
 
+        # Avg prices are updated incrementally, the position already holds the filled quantities
         # If the order is a position entry
         if order.side is entry_side:
             # Calculate avg position entry price
-            entry_orders = self.storage.get_orders(position.symbol, position.id, entry_side)
-            total_price = sum([order.quantity * order.entry_price for order in entry_orders])
-            total_quantity = sum([order.quantity for order in entry_orders])
-            position.entry_price = total_price / total_quantity
+            entered = position.total_quantity
+            total_price = position.entry_price * entered + order.quantity * order.entry_price
+            position.entry_price = total_price / (entered + order.quantity)
             position.quantity += order.quantity
             position.total_quantity += order.quantity
 
         else:
             # Calculate avg position exit price
-            exit_orders = self.storage.get_orders(position.symbol, position.id, exit_side)
-            total_price = sum([order.quantity * order.entry_price for order in exit_orders])
-            total_quantity = sum([order.quantity for order in exit_orders])
-            position.exit_price = total_price / total_quantity
+            exited = position.total_quantity - position.quantity
+            total_price = position.exit_price * exited + order.quantity * order.entry_price
+            position.exit_price = total_price / (exited + order.quantity)
             position.quantity -= order.quantity
 
             # Close position
@@ -210,10 +243,22 @@ class CommandHandler:
                 position.status = PositionStatus.CLOSED
 
         position.orders.append(order.id)
-        position.update_timestamp = int(time() * 1000)
-
-        # Update position
-        await self.db.update(position, query={'id': position.id})
+        position.update_timestamp = time_ns() // 1_000_000
+
+        # Update position, only the fields a fill changes, returns once the batch is written
+        await self.db.queue_partial_update(
+            model=PositionModel,
+            update_fields={
+                'status': position.status,
+                'quantity': position.quantity,
+                'total_quantity': position.total_quantity,
+                'entry_price': position.entry_price,
+                'exit_price': position.exit_price,
+                'orders': list(position.orders),
+                'update_timestamp': position.update_timestamp,
+            },
+            query={'id': position.id}
+        )
 
         if position.is_closed:
             # Clean up local state
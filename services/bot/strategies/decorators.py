@@ -1,13 +0,0 @@
-import functools
-
-
-def method_dispatch(func):
-    dispatcher = functools.singledispatch(func)
-
-    def wrapper(*args, **kw):
-        return dispatcher.dispatch(args[1].__class__)(*args, **kw)
-
-    wrapper.register = dispatcher.register
-    functools.update_wrapper(wrapper, func)
-
-    return wrapper
@@ -1,25 +1,30 @@
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Tuple
 
 from modules.models import OrderModel, PositionModel
 from modules.models.types import OrderId, PositionId, OrderSide, PositionSide, Symbol
 
 
 class LocalStorage:
-    def __init__(self):
-        self._positions: Dict[Symbol, Dict[PositionSide, PositionModel]] = {}
-        self._orders: Dict[Symbol, Dict[OrderId: OrderModel]] = {}
+    def __init__(self, symbols: List[Symbol]):
+        # The symbols are known upfront, so their containers always exist
+        self._positions: Dict[Symbol, Dict[PositionSide, PositionModel]] = {symbol: {} for symbol in symbols}
+        self._orders: Dict[Symbol, Dict[OrderId, OrderModel]] = {symbol: {} for symbol in symbols}
+
+        # Orders of a position, in the order they were added
+        self._position_orders: Dict[PositionId, Dict[OrderId, OrderModel]] = {}
+        self._position_side_orders: Dict[Tuple[PositionId, OrderSide], Dict[OrderId, OrderModel]] = {}
 
     def add_position(self, position: PositionModel):
-        self._positions.setdefault(position.symbol, {})[position.side] = position
+        self._positions[position.symbol][position.side] = position
 
     def drop_position(self, symbol: Symbol, position_side: PositionSide):
-        self._positions.get(symbol, {}).pop(position_side, None)
+        self._positions[symbol].pop(position_side, None)
 
     def get_position(self, symbol: Symbol, position_side: PositionSide) -> Optional[PositionModel]:
-        return self._positions.get(symbol, {}).get(position_side)
+        return self._positions[symbol].get(position_side)
 
     def get_order(self, symbol: Symbol, order_id: OrderId) -> Optional[OrderModel]:
-        return self._orders.get(symbol, {}).get(order_id)
+        return self._orders[symbol].get(order_id)
 
     def get_orders(
             self,
@@ -27,25 +32,36 @@ class LocalStorage:
             position_id: PositionId,
             order_side: Optional[OrderSide] = None
     ) -> List[OrderModel]:
-        orders = []
+        # Position ids are unique across symbols
+        if order_side:
+            orders = self._position_side_orders.get((position_id, order_side), {})
+        else:
+            orders = self._position_orders.get(position_id, {})
 
-        for order in self._orders.get(symbol, {}).values():
-            if order.position_id != position_id:
-                continue
+        return list(orders.values())
 
-            if order_side and order.side != order_side:
-                continue
+    def count_orders(self, symbol: Symbol, position_id: PositionId, order_side: OrderSide) -> int:
+        return len(self._position_side_orders.get((position_id, order_side), ()))
 
-            orders.append(order)
+    def add_order(self, order: OrderModel):
+        orders = self._orders[order.symbol]
+        prev_order = orders.get(order.id)
 
-        return orders
+        # The updated order replaces the previous one, which may belong to another position
+        if prev_order:
+            self._unindex_order(prev_order)
 
-    def add_order(self, order: OrderModel):
-        self._orders.setdefault(order.symbol, {})[order.id] = order
+        orders[order.id] = order
+        self._position_orders.setdefault(order.position_id, {})[order.id] = order
+        self._position_side_orders.setdefault((order.position_id, order.side), {})[order.id] = order
 
     def drop_orders(self, symbol: Symbol, position_id: PositionId):
-        self._orders[symbol] = {
-            order_id: order
-            for order_id, order in self._orders[symbol].items()
-            if order.position_id != position_id
-        }
+        orders = self._orders[symbol]
+
+        for order in self._position_orders.pop(position_id, {}).values():
+            orders.pop(order.id, None)
+            self._position_side_orders.pop((position_id, order.side), None)
+
+    def _unindex_order(self, order: OrderModel):
+        self._position_orders.get(order.position_id, {}).pop(order.id, None)
+        self._position_side_orders.get((order.position_id, order.side), {}).pop(order.id, None)
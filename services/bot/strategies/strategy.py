@@ -3,19 +3,18 @@ import asyncio
 import inspect
 import logging
 from decimal import Decimal
-from itertools import chain
 from typing import Optional, Set, Callable, List, Dict, Any, Tuple
 
 from helpers import remove_exponent, to_decimal_places
 
-from modules.mongo import MongoClient
+from modules.mongo import BatchedMongoClient
 from modules.models import OrderModel, PositionModel, AccountModel, AccountConfigModel
 from modules.models.commands import TrailingStop, PlaceOrder
 from modules.models.strategy import StrategyRules
 from modules.models.exchange import AccountPositionModel, AccountBalanceModel
 from modules.models.types import (
     PositionStatus, OrderSide, UserStreamEntity,
-    PositionSide, Asset, Timeframe, Symbol, Indicator
+    PositionSide, PositionId, Asset, Timeframe, Symbol, Indicator
 )
 from modules.exchanges import BinanceUserStreamClient
 from modules.exchanges.base import BaseExchangeClient, BaseExchangeUserClient
@@ -24,6 +23,9 @@ from services.bot.strategies.command_handler import CommandHandler
 from services.bot.strategies.storage import LocalStorage
 from services.bot.state import ExchangeState
 
+# Checked for open positions on every book update
+POSITION_SIDES = tuple(PositionSide.values())
+
 
 class Strategy(metaclass=abc.ABCMeta):
     name: str
@@ -32,7 +34,7 @@ class Strategy(metaclass=abc.ABCMeta):
     def __init__(
             self,
             rules: StrategyRules,
-            db: MongoClient,
+            db: BatchedMongoClient,
             state: ExchangeState,
             exchange: BaseExchangeUserClient,
             user_stream: BinanceUserStreamClient,
@@ -40,6 +42,32 @@ class Strategy(metaclass=abc.ABCMeta):
         self.rules = rules
         self.db = db
         self.state = state
+        self._symbols = frozenset(rules.symbols)
+
+        # Indicator parameters of each condition for every signal candle, the rules never change
+        self._signal_parameters: List[Tuple[StrategyRules.StrategyCondition, List[Dict]]] = [
+            (cond, [
+                {**{i.field: i.value for i in cond.parameters}, 'index': -n}
+                for n in range(1, cond.save_signal_candles + 1)
+            ])
+            for cond in rules.conditions
+        ]
+
+        # Entry price multipliers of the stop loss and take profit levels, the rules never change
+        self._stop_loss_factors: Dict[PositionSide, Decimal] = {}
+        self._take_profit_factors: Dict[PositionSide, List[Decimal]] = {}
+
+        if rules.stop_loss:
+            self._stop_loss_factors = {
+                PositionSide.LONG: 1 - rules.stop_loss.rate,
+                PositionSide.SHORT: 1 + rules.stop_loss.rate,
+            }
+
+        if rules.take_profit:
+            self._take_profit_factors = {
+                PositionSide.LONG: [1 + step.level for step in rules.take_profit.steps],
+                PositionSide.SHORT: [1 - step.level for step in rules.take_profit.steps],
+            }
 
         self.exchange = exchange
         self.user_stream = user_stream
@@ -50,7 +78,7 @@ class Strategy(metaclass=abc.ABCMeta):
         self._callbacks: Dict[str, Set] = {}
         self._loop = asyncio.get_event_loop()
 
-        self.storage = LocalStorage()
+        self.storage = LocalStorage(self.rules.symbols)
         self.command_handler = CommandHandler(
             db=self.db,
             exchange=self.exchange,
@@ -88,12 +116,11 @@ class Strategy(metaclass=abc.ABCMeta):
         output: Dict[Tuple[PositionSide, OrderSide], Dict[Tuple[Indicator, Timeframe], bool]] = {}
         quantity = self.calc_trade_quantity(symbol, self.rules.balance_stake, OrderSide.BUY)
 
-        for cond in self.rules.conditions:
+        for cond, signal_parameters in self._signal_parameters:
             candles = self.state.get_candles(symbol, cond.timeframe)
             result = False
 
-            for index in list(map(lambda i: i * -1, range(1, cond.save_signal_candles + 1))):
-                parameters = {**{i.field: i.value for i in cond.parameters}, 'index': index}
+            for parameters in signal_parameters:
                 values = candles.get(cond.indicator, parameters)
 
                 for i in cond.conditions:
@@ -116,9 +143,7 @@ class Strategy(metaclass=abc.ABCMeta):
                 position = self.storage.get_position(symbol, position_side)
 
                 if position:
-                    orders = self.storage.get_orders(symbol, position.id, order_side)
-
-                    if orders:
+                    if self.storage.count_orders(symbol, position.id, order_side):
                         continue
 
                 self.place_order(
@@ -261,14 +286,16 @@ class Strategy(metaclass=abc.ABCMeta):
         return quantity
 
     async def on_book_update(self, symbol: Symbol):
-        if symbol not in self.rules.symbols:
+        if symbol not in self._symbols:
             return
 
         if not self._ready:
             return
 
-        for position_side in PositionSide.values():
-            position = self.storage.get_position(symbol, position_side)
+        get_position = self.storage.get_position
+
+        for position_side in POSITION_SIDES:
+            position = get_position(symbol, position_side)
 
             if position:
                 self.check_stop_loss(symbol, position)
@@ -278,7 +305,7 @@ class Strategy(metaclass=abc.ABCMeta):
         if not self._ready:
             return
 
-        if symbol not in self.rules.symbols:
+        if symbol not in self._symbols:
             return
 
         self.check_signal(symbol)
@@ -312,12 +339,12 @@ class Strategy(metaclass=abc.ABCMeta):
 
         if position.side is PositionSide.LONG:
             price = book.bid
-            trigger = position.entry_price * (1 - self.rules.stop_loss.rate)
+            trigger = position.entry_price * self._stop_loss_factors[PositionSide.LONG]
             triggered = price <= trigger
 
         elif position.side is PositionSide.SHORT:
             price = book.ask
-            trigger = position.entry_price * (1 + self.rules.stop_loss.rate)
+            trigger = position.entry_price * self._stop_loss_factors[PositionSide.SHORT]
             triggered = price >= trigger
 
         if triggered:
@@ -346,8 +373,7 @@ class Strategy(metaclass=abc.ABCMeta):
         order_side = None
         steps_count = self.rules.take_profit.steps_count
         exit_side = position.get_exit_order_side()
-        exit_orders = self.storage.get_orders(position.symbol, position.id, exit_side)
-        next_step = len(exit_orders) + 1
+        next_step = self.storage.count_orders(position.symbol, position.id, exit_side) + 1
 
         if steps_count < next_step:
             return
@@ -356,11 +382,11 @@ class Strategy(metaclass=abc.ABCMeta):
 
         if position.side is PositionSide.LONG:
             order_side = OrderSide.SELL
-            triggered = book.bid >= position.entry_price * (1 + step.level)
+            triggered = book.bid >= position.entry_price * self._take_profit_factors[PositionSide.LONG][next_step - 1]
 
         elif position.side is PositionSide.SHORT:
             order_side = OrderSide.BUY
-            triggered = book.ask <= position.entry_price * (1 - step.level)
+            triggered = book.ask <= position.entry_price * self._take_profit_factors[PositionSide.SHORT][next_step - 1]
 
         if triggered and order_side:
             logging.info(f'Take profit level {step.level} reached! '
@@ -376,7 +402,7 @@ class Strategy(metaclass=abc.ABCMeta):
                 diff_quantity = quantity - prev_quantity
 
             # If stake of the remaining steps less than min_notional - use the entire quantity
-            rest_stake = sum([self.rules.take_profit.steps[i - 1].stake for i in range(next_step, steps_count)])
+            rest_stake = sum(self.rules.take_profit.steps[i - 1].stake for i in range(next_step, steps_count))
             rest_quantity = position.total_quantity * rest_stake - diff_quantity
 
             if rest_quantity * price < contract.min_notional:
@@ -409,34 +435,60 @@ class Strategy(metaclass=abc.ABCMeta):
         await self._set_positions(account.positions)
 
     async def _set_positions(self, positions: List[AccountPositionModel]):
-        db_positions_list: List[PositionModel] = await self.db.find(
-            model=PositionModel,
-            query={
-                'symbol': {'$in': self.rules.symbols},
-                'strategy_id': self.rules.id,
-                'status': PositionStatus.OPEN,
-            }
-        )
-
-        db_positions: Dict[Symbol, Dict[PositionSide, PositionModel]] = {}
-        acc_positions: Dict[Symbol, Dict[PositionSide, AccountPositionModel]] = {}
-        all_positions: List[PositionModel] = []
-
-        for position in db_positions_list:
-            db_positions.setdefault(position.symbol, {})[position.side] = position
+        # Positions come with their orders embedded, in one round trip
+        pipeline = [
+            {
+                '$match': {
+                    'symbol': {'$in': self.rules.symbols},
+                    'strategy_id': self.rules.id,
+                    'status': PositionStatus.OPEN,
+                }
+            },
+            {
+                '$lookup': {
+                    'from': OrderModel.__name__,
+                    'localField': 'orders',
+                    'foreignField': 'id',
+                    'as': 'order_docs',
+                }
+            },
+        ]
+
+        db_positions: Dict[Tuple[Symbol, PositionSide], PositionModel] = {}
+        db_orders: Dict[PositionId, List[OrderModel]] = {}
+        acc_positions: Dict[Tuple[Symbol, PositionSide], AccountPositionModel] = {}
+        acc_counts: Dict[Symbol, int] = {}
+
+        async for record in self.db.aggregate_iter(PositionModel, pipeline):
+            order_docs = {doc['id']: doc for doc in record.pop('order_docs')}
+            position = PositionModel(**record)
+            db_positions[(position.symbol, position.side)] = position
+
+            # $lookup does not keep the order of the ids, restore it to add the orders as they were filled
+            db_orders[position.id] = [
+                OrderModel(**order_docs[order_id])
+                for order_id in position.orders
+                if order_id in order_docs
+            ]
 
         for position in positions:
-            acc_positions.setdefault(position.symbol, {})[position.side] = position
+            acc_positions[(position.symbol, position.side)] = position
+
+            if position.quantity > 0:
+                acc_counts[position.symbol] = acc_counts.get(position.symbol, 0) + 1
 
         for symbol in self.rules.symbols:
             actual_positions = []
-            cur_positions = [position for position in positions if position.symbol == symbol and position.quantity > 0]
             contract = self.state.get_contract(symbol)
 
             # Match positions
-            for side in set(db_positions.get(symbol, {})) & set(acc_positions.get(symbol, {})):
-                db_position = db_positions[symbol][side]
-                acc_position = acc_positions[symbol][side]
+            for side in POSITION_SIDES:
+                db_position = db_positions.get((symbol, side))
+                acc_position = acc_positions.get((symbol, side))
+
+                if not db_position or not acc_position:
+                    continue
+
                 db_position_price = to_decimal_places(db_position.entry_price, contract.lot_size)
                 acc_position_price = to_decimal_places(acc_position.entry_price, contract.lot_size)
 
@@ -444,29 +496,16 @@ class Strategy(metaclass=abc.ABCMeta):
                     actual_positions.append(db_position)
 
             # Check for unknown positions
-            if len(actual_positions) != len(cur_positions):
+            if len(actual_positions) != acc_counts.get(symbol, 0):
                 self._busy.add(symbol)
 
-            all_positions.extend(actual_positions)
-            await self._configure_leverage(symbol)
+            for position in actual_positions:
+                self.storage.add_position(position)
 
-        orders: List[OrderModel] = await self.db.find(
-            model=OrderModel,
-            query={
-                'id': {
-                    '$in': list(chain.from_iterable([
-                        position.orders
-                        for position in all_positions
-                    ]))
-                }
-            }
-        )
+                for order in db_orders[position.id]:
+                    self.storage.add_order(order)
 
-        for position in all_positions:
-            self.storage.add_position(position)
-
-        for order in orders:
-            self.storage.add_order(order)
+            await self._configure_leverage(symbol)
 
     async def _configure_mode(self):
         hedge_mode = await self.exchange.is_hedge_mode()
@@ -1,6 +1,6 @@
 import asyncio
 import logging
-from time import time
+from time import time_ns
 from typing import Dict
 
 from modules.exchanges import BinanceStreamClient
@@ -24,7 +24,6 @@ class LineServer:
         self.stream = BinanceStreamClient(testnet=settings.binance_testnet)
         self.publisher = LinePublisher(settings.broker_amqp_uri)
         self.prices: Dict[Symbol, BookUpdateModel] = {}
-        self._loop = asyncio.get_event_loop()
         self._started = False
         self._counter = 0
 
@@ -38,12 +37,12 @@ class LineServer:
         await self.stream.connect()
 
         self._started = True
-        self._loop.create_task(self._alive_task())
-        self._loop.create_task(self._log_task())
+        asyncio.create_task(self._alive_task())
+        asyncio.create_task(self._log_task())
 
     async def stop(self):
         self._started = False
-        self._loop.stop()
+        asyncio.get_running_loop().stop()
 
     async def _on_connect(self):
         await self.stream.subscribe(self.symbols)
@@ -122,7 +121,7 @@ class LineServer:
             self._counter = 0
 
     async def _check_delay(self, timestamp: Timestamp):
-        diff = time() * 1000 - timestamp
+        diff = time_ns() // 1_000_000 - timestamp
 
         if diff >= 5000:
             logging.warning(f'Messages processing delay of {diff / 1000:.2f}s!')
@@ -70,8 +70,7 @@ class LineLogger:
             data=model.encode(),
             timestamp=int(time.time() * 1000),
         )
-        data = log_model.dict(by_alias=True)
-        operation = InsertOne(data)
+        operation = InsertOne(log_model.encode())
         await self._queue.put(operation)
 
     async def _on_trade_update(self, symbol: Symbol, model: TradeUpdateModel):
@@ -81,8 +80,7 @@ class LineLogger:
             data=model.encode(),
             timestamp=int(time.time() * 1000),
         )
-        data = log_model.dict(by_alias=True)
-        operation = InsertOne(data)
+        operation = InsertOne(log_model.encode())
         await self._queue.put(operation)
 
     async def _on_depth_update(self, symbol: Symbol, model: DepthUpdateModel):
@@ -92,6 +90,5 @@ class LineLogger:
             data=model.encode(),
             timestamp=int(time.time() * 1000),
         )
-        data = log_model.dict(by_alias=True)
-        operation = InsertOne(data)
+        operation = InsertOne(log_model.encode())
         await self._queue.put(operation)